@@ -1,13 +1,21 @@
 import os
+import shutil
 import logging
-import pandas as pd
 from pydantic import BaseModel
 from backend.engine import run_proc
+from typing import Optional
 from fastapi import FastAPI, HTTPException
+from fastapi.middleware.gzip import GZipMiddleware
 from backend.parser.parser import parse_script
-from backend.executor.data_step import run_data_step
+from backend.executor.results import result_cache
+from backend.executor.step_cache import step_cache
+from backend.executor.partitions import expand_paths
+from backend.executor.shared_store import dataset_session
+from backend.executor.data_step import run_data_step, work_path, writes_work, load_dataset, request_work_dir, records
 
 app = FastAPI()
+# Result pages can be large; compress them on the wire
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 # Ensure logs directory exists
 os.makedirs("logs", exist_ok=True)
@@ -16,6 +24,7 @@ class ScriptRequest(BaseModel):
     code: str
     output_format: str = "json"
     limit: int = 50
+    use_cache: bool = True
 
 @app.post("/run-script")
 def run_script(req: ScriptRequest):
@@ -25,34 +34,116 @@ def run_script(req: ScriptRequest):
         logging.error(f"Parse error: {e}")
         raise HTTPException(status_code=400, detail=f"Parse error: {e}")
 
+    # Shared datasets attached while running stay pinned until the script finishes
+    work_dir = request_work_dir()
+    owned = set()
+    try:
+        with dataset_session():
+            return run_blocks(blocks, req, work_dir, owned)
+    finally:
+        discard_work(work_dir, owned)
+
+def discard_work(work_dir: str, owned) -> None:
+    """
+    Remove what a request wrote to its WORK directory, except files that a step
+    cache entry took over; those go when the entry is evicted.
+    """
+    if not os.path.isdir(work_dir):
+        return
+    if not owned:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return
+    for name in os.listdir(work_dir):
+        path = os.path.join(work_dir, name)
+        if path not in owned:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+def step_inputs(plan) -> list:
+    """
+    Dataset files a step reads, used to fingerprint it for the step cache.
+    """
+    if "merge" in plan:
+        return [ds["path"] for ds in plan["merge"]]
+    if "paths" in plan:
+        try:
+            return expand_paths(plan["paths"])
+        except FileNotFoundError:
+            return plan["paths"]
+    path = plan.get("path") or (plan.get("set") or {}).get("path")
+    return [path] if path else []
+
+def run_cached(plan, inputs, req: ScriptRequest, run, outputs=(), owned=None):
+    """
+    Serve a step from the on-disk step cache, or run it and cache the result.
+    Returns the output and the files holding the step's dataset: those recorded
+    with the cached entry on a hit, otherwise the ones the run wrote. Files the
+    new cache entry took over are added to owned.
+    """
+    key = None
+    if req.use_cache:
+        key = step_cache.key(plan, inputs, output_format=req.output_format, limit=req.limit)
+    if key is not None:
+        entry = step_cache.lookup(key)
+        if entry is not None:
+            return entry["result"], list(entry["outputs"])
+    output = run()
+    if key is not None and not (isinstance(output, dict) and "error" in output):
+        if step_cache.put(key, output, outputs) and owned is not None:
+            owned.update(outputs)
+    return output, list(outputs)
+
+def run_blocks(blocks, req: ScriptRequest, work_dir: str = None, owned=None):
     df = None
     last_path = None
     results = []
 
     for plan in blocks:
         if plan.get("type") == "data_step":
+            # remember last dataset path for subsequent PROCs
+            if writes_work(plan):
+                outputs = [work_path(plan["name"], work_dir)]
+            else:
+                outputs = []
+            df = None
             try:
-                proc_output = run_data_step(plan, output_format=req.output_format, limit=req.limit)
+                # The WORK directory is left out of the cache key so other requests can hit it
+                proc_output, written = run_cached(
+                    plan, step_inputs(plan), req,
+                    lambda: run_data_step({**plan, "work_dir": work_dir},
+                                          output_format=req.output_format, limit=req.limit),
+                    outputs, owned)
             except Exception as e:
                 logging.error(f"DATA step error: {e}")
                 raise HTTPException(status_code=400, detail=f"DATA step error: {e}")
+            if written:
+                last_path = written[0]
+            else:
+                last_path = plan.get("path") or (plan.get("set") or {}).get("path")
             results.append(proc_output)
-            # remember last dataset path for subsequent PROCs
-            last_path = plan.get("path") or (plan.get("set") or {}).get("path")
 
         elif plan.get("type", "").startswith("proc_"):
-            if df is None:
-                if last_path is not None:
+            if last_path is None:
+                raise HTTPException(status_code=400, detail="No dataset loaded before PROC")
+
+            def run(plan=plan):
+                nonlocal df
+                if df is None:
                     try:
                         # reload dataset for PROC steps
-                        df = pd.read_csv(last_path)
+                        df = load_dataset(last_path)
                     except Exception as e:
                         logging.error(f"Failed to reload last dataset '{last_path}': {e}")
                         raise HTTPException(status_code=400, detail=f"Failed to reload last dataset '{last_path}': {e}")
-                else:
-                    raise HTTPException(status_code=400, detail="No dataset loaded before PROC")
+                return run_proc(plan, df, output_format=req.output_format, limit=req.limit)
 
-            proc_output = run_proc(plan, df, output_format=req.output_format, limit=req.limit)
+            if plan["type"] == "proc_print":
+                # PROC PRINT hands out a result handle that would not outlive the worker
+                proc_output = run()
+            else:
+                proc_output, _ = run_cached(plan, [last_path], req, run)
             results.append(proc_output)
 
         else:
@@ -66,3 +157,24 @@ def run_script(req: ScriptRequest):
             "steps": len(blocks),
             "results": results,
         }
+
+@app.delete("/cache")
+def clear_cache():
+    return {"message": "Step cache cleared", "entries": step_cache.clear()}
+
+@app.get("/results/{result_id}")
+def get_results(result_id: str, offset: int = 0, limit: int = 50,
+                sort: Optional[str] = None, descending: bool = False,
+                output_format: str = "json"):
+    try:
+        page = result_cache.page(result_id, offset=offset, limit=limit, sort=sort, descending=descending)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Unknown result: {result_id}")
+    rows = page.pop("rows")
+    if output_format == "html":
+        page["html"] = rows.to_html(index=False)
+    else:
+        page["rows"] = records(rows)
+    return page
@@ -4,6 +4,8 @@ import pandas as pd
 import statsmodels.api as sm
 import matplotlib.pyplot as plt
 from typing import Dict, List, Tuple, Optional
+from backend.executor.results import result_cache
+from backend.executor.data_step import records
 
 # ----- DATA step clause functions -----
 
@@ -103,7 +105,7 @@ def proc_print(df: pd.DataFrame, plan: Dict, output_format: str = "json") -> Dic
         return {
             "message": "PROC PRINT executed",
             "columns": list(df_out.columns),
-            "preview": df_out.to_dict(orient="records"),
+            "preview": records(df_out),
             "shape": list(df.shape),
         }
 
@@ -220,12 +222,14 @@ def run_proc(plan: dict, df: pd.DataFrame = None, output_format: str = "json", l
 
     try:
         if proc_type == "proc_print":
-            # Limit rows
-            obs = plan.get("obs", limit)
-            subset = df.head(obs)
+            # Keep the whole result server-side and return only the first page
+            subset = df.head(plan["obs"]) if "obs" in plan else df
             if "var" in plan:
                 subset = subset[plan["var"]]
-            return subset.to_dict(orient="records") if output_format == "json" else subset.to_html()
+            output = proc_print(subset, {"obs": limit}, output_format)
+            # Saved as the VAR/OBS projection of df, so a shared dataset is not copied
+            output.update(result_cache.save(df, columns=plan.get("var"), rows=plan.get("obs")))
+            return output
 
         elif proc_type == "proc_means":
             summary = df.describe()
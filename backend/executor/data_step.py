@@ -1,5 +1,14 @@
+import uuid
 from pathlib import Path
 import pandas as pd
+from backend.executor.merge import join_type, merge_datasets, read_header, write_chunks
+from backend.executor.shared_store import load_shared
+from backend.executor.partitions import expand_paths, prune_parts, read_parts, with_partitions
+from backend.executor.expressions import categorical_compare, compile_program
+
+# DATA step outputs that are too large to hold in memory are written here,
+# one subdirectory per request so concurrent scripts never share a file
+WORK_DIR = "work"
 
 class Env:
     def __init__(self):
@@ -13,7 +22,13 @@ class Env:
 
 def load_dataset(path: str, sheet: str = None) -> pd.DataFrame:
     """
-    Load a dataset from CSV or Excel.
+    Load a dataset from CSV or Excel, through the cross-worker shared store when enabled.
+    """
+    return load_shared(path, sheet, lambda: read_dataset(path, sheet))
+
+def read_dataset(path: str, sheet: str = None) -> pd.DataFrame:
+    """
+    Read a dataset from CSV or Excel.
     """
     ext = Path(path).suffix.lower()
     if ext == ".csv":
@@ -25,24 +40,37 @@ def load_dataset(path: str, sheet: str = None) -> pd.DataFrame:
 
 def apply_clauses(df: pd.DataFrame, block: dict) -> pd.DataFrame:
     """
-    Apply WHERE, KEEP, DROP, RENAME clauses to a dataframe.
+    Apply WHERE, assignment, KEEP, DROP, RENAME clauses to a dataframe.
     """
     if "where" in block:
         cond = block["where"]
         col, op, val = cond["column"], cond["op"], cond["value"]
-        if op == ">":
-            df = df[df[col] > float(val)]
+        # Compare numeric columns (including partition columns) as numbers,
+        # falling back to text when the value is not a number
+        if pd.api.types.is_numeric_dtype(df[col]):
+            try:
+                val = float(val)
+            except ValueError:
+                pass
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            # Text columns attached from the shared store
+            df = df[categorical_compare(op, df[col], val)]
+        elif op == ">":
+            df = df[df[col] > val]
         elif op == "<":
-            df = df[df[col] < float(val)]
+            df = df[df[col] < val]
         elif op == "=":
             df = df[df[col] == val]
         elif op == ">=":
-            df = df[df[col] >= float(val)]
+            df = df[df[col] >= val]
         elif op == "<=":
-            df = df[df[col] <= float(val)]
+            df = df[df[col] <= val]
         elif op == "!=":
             df = df[df[col] != val]
 
+    if "compute" in block:
+        df = compile_program(block["compute"])(df)
+
     if "keep" in block:
         df = df[block["keep"]]
 
@@ -55,12 +83,97 @@ def apply_clauses(df: pd.DataFrame, block: dict) -> pd.DataFrame:
 
     return df
 
+# Clauses that change a SET dataset, so the result has to be written to WORK
+CLAUSES = ("where", "compute", "keep", "drop", "rename")
+
+def writes_work(plan: dict) -> bool:
+    """
+    Whether a DATA step produces a new dataset in WORK rather than reusing its source file.
+    """
+    return "merge" in plan or "paths" in plan or any(c in plan for c in CLAUSES)
+
+def request_work_dir() -> str:
+    """
+    A fresh WORK library for one request.
+    """
+    return str(Path(WORK_DIR) / uuid.uuid4().hex)
+
+def work_path(name: str, work_dir: str = None) -> str:
+    """
+    Path of the CSV file a DATA step writes its output dataset to.
+    """
+    return str(Path(work_dir or WORK_DIR) / f"{name}.csv")
+
+def records(df: pd.DataFrame) -> list:
+    """
+    Rows as JSON-safe dicts; missing values become None, since NaN is not valid JSON.
+    """
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+def format_output(columns, preview: pd.DataFrame, shape, output_format="json") -> dict:
+    if output_format == "html":
+        return {
+            "message": "DATA step executed",
+            "html": preview.to_html(index=False),
+            "columns": columns,
+            "shape": shape,
+        }
+    return {
+        "message": "DATA step executed",
+        "columns": columns,
+        "preview": records(preview),
+        "shape": shape,
+    }
+
+def run_merge_step(plan, output_format="json"):
+    """
+    Run a MERGE ... BY step, streaming the joined rows into the WORK library.
+    """
+    how = join_type(plan["merge"], plan.get("if"))
+    chunks = merge_datasets(plan["merge"], plan.get("by", []), how=how)
+    out = write_chunks(chunks, work_path(plan.get("name", "_merge"), plan.get("work_dir")),
+                       transform=lambda df: apply_clauses(df, plan))
+    return format_output(out["columns"], out["preview"], out["shape"], output_format)
+
+def run_multi_set_step(plan, output_format="json"):
+    """
+    Run a SET over several files or glob patterns. Parts whose key=value path
+    segments rule out the WHERE condition are skipped; the rest are read in
+    parallel and the combined dataset is written to the WORK library.
+    """
+    files = expand_paths(plan["paths"])
+    sheet = plan.get("sheet")
+    # Parts share a layout; the first one's header says which names are data columns
+    header = read_header(files[0], sheet) if files else pd.DataFrame()
+    kept = prune_parts(files, plan.get("where"), list(header.columns))
+    if kept:
+        df = read_parts(kept, lambda path: load_dataset(path, sheet),
+                        transform=lambda part: apply_clauses(part, plan))
+    else:
+        # Every part was pruned; still write the columns the step would have produced
+        df = apply_clauses(with_partitions(header, files[0]), plan)
+    out_path = Path(work_path(plan.get("name", "_set"), plan.get("work_dir")))
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out_path, index=False)
+    return format_output(list(df.columns), df.head(10), list(df.shape), output_format)
+
 def run_data_step(plan, output_format="json", limit=20):
     try:
+        if "merge" in plan:
+            return run_merge_step(plan, output_format)
+        if "paths" in plan:
+            return run_multi_set_step(plan, output_format)
         path = plan.get("path")
         if not path:
             return {"message": "DATA step error", "error": "No dataset path"}
-    except FileNotFoundError:
-        return {"message": "DATA step error", "error": "Failed to read CSV"}
+        df = load_dataset(path, plan.get("sheet"))
+        if writes_work(plan):
+            df = apply_clauses(df, plan)
+            out_path = Path(work_path(plan.get("name", "_set"), plan.get("work_dir")))
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            df.to_csv(out_path, index=False)
+        return format_output(list(df.columns), df.head(10), list(df.shape), output_format)
+    except FileNotFoundError as e:
+        return {"message": "DATA step error", "error": f"Failed to read CSV: {e}"}
     except Exception as e:
         return {"message": "DATA step error", "error": str(e)}
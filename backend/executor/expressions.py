@@ -0,0 +1,407 @@
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Expression nodes are the tuples built by the parser:
+#   ("const", value) ("column", name) ("neg", e) ("not", e) ("and", a, b) ("or", a, b)
+#   ("compare", op, a, b) ("binary", op, a, b) ("call", NAME, (args...))
+# and statements are ("assign", name, expr) or ("if", cond, then_stmt, else_stmt).
+
+
+def as_series(value, index: pd.Index) -> pd.Series:
+    if isinstance(value, pd.Series):
+        return value
+    return pd.Series(value, index=index)
+
+
+def to_mask(value):
+    """
+    SAS truth: true when non-zero and not missing.
+    """
+    if isinstance(value, pd.Series):
+        if value.dtype == bool:
+            return value
+        return value.notna() & (value != 0)
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    return not pd.isna(value) and value != 0
+
+
+def text(value, index: pd.Index) -> pd.Series:
+    series = as_series(value, index)
+    return series.astype(object).where(series.notna(), "").astype(str)
+
+
+def divide(left, right):
+    # Division by zero gives a missing value, as in SAS
+    if isinstance(right, pd.Series):
+        return left / right.where(right != 0)
+    if right == 0:
+        return np.nan
+    return left / right
+
+
+def sas_round(x, unit=1):
+    # Round half away from zero to the nearest multiple of unit
+    return np.sign(x) * np.floor(np.abs(x) / unit + 0.5) * unit
+
+
+def positive(func):
+    def apply(x):
+        return func(x.where(x > 0) if isinstance(x, pd.Series) else (x if x > 0 else np.nan))
+    return apply
+
+
+def rowwise(method: str):
+    def apply(index, *args):
+        frame = pd.concat([as_series(a, index) for a in args], axis=1)
+        return getattr(frame, method)(axis=1, skipna=True)
+    return apply
+
+
+def substr(s: pd.Series, pos, length=None):
+    start = int(pos) - 1
+    return s.str.slice(start, None if length is None else start + int(length))
+
+
+def cats(*parts: pd.Series) -> pd.Series:
+    result = parts[0].str.strip()
+    for part in parts[1:]:
+        result = result + part.str.strip()
+    return result
+
+
+# Numeric functions take values; string functions take a Series for their first argument.
+# Entries are (implementation, min args, max args, kind).
+FUNCTIONS = {
+    "LOG": (positive(np.log), 1, 1, "numeric"),
+    "LOG10": (positive(np.log10), 1, 1, "numeric"),
+    "EXP": (np.exp, 1, 1, "numeric"),
+    "SQRT": (lambda x: np.sqrt(x.where(x >= 0) if isinstance(x, pd.Series) else x), 1, 1, "numeric"),
+    "ABS": (np.abs, 1, 1, "numeric"),
+    "CEIL": (np.ceil, 1, 1, "numeric"),
+    "FLOOR": (np.floor, 1, 1, "numeric"),
+    "INT": (np.trunc, 1, 1, "numeric"),
+    "ROUND": (sas_round, 1, 2, "numeric"),
+    "MOD": (np.fmod, 2, 2, "numeric"),
+    "MIN": (rowwise("min"), 1, None, "rowwise"),
+    "MAX": (rowwise("max"), 1, None, "rowwise"),
+    "SUM": (rowwise("sum"), 1, None, "rowwise"),
+    "UPCASE": (lambda s: s.str.upper(), 1, 1, "string"),
+    "LOWCASE": (lambda s: s.str.lower(), 1, 1, "string"),
+    "SUBSTR": (substr, 2, 3, "string"),
+    "LENGTH": (lambda s: s.str.rstrip().str.len(), 1, 1, "string"),
+    "STRIP": (lambda s: s.str.strip(), 1, 1, "string"),
+    "TRIM": (lambda s: s.str.rstrip(), 1, 1, "string"),
+    "CATS": (cats, 1, None, "concat"),
+}
+
+def sas_order(value):
+    """
+    Stand-in values that order missing below everything, as SAS does: -inf for
+    numbers, the blank string for text.
+    """
+    if isinstance(value, pd.Series):
+        if not value.hasnans:
+            return value
+        if pd.api.types.is_numeric_dtype(value) and not pd.api.types.is_bool_dtype(value):
+            return value.astype(float).fillna(-np.inf)
+        return value.astype(object).where(value.notna(), "")
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return -np.inf
+    return value
+
+
+COMPARE = {
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+    "=": lambda a, b: a == b,
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+    "!=": lambda a, b: a != b,
+}
+
+# The same comparison with its operands swapped
+FLIPPED = {">": "<", "<": ">", "=": "=", ">=": "<=", "<=": ">=", "!=": "!="}
+
+
+def is_categorical(value) -> bool:
+    return isinstance(value, pd.Series) and isinstance(value.dtype, pd.CategoricalDtype)
+
+
+def categorical_compare(op: str, series: pd.Series, value, missing=None) -> pd.Series:
+    """
+    Compare a categorical column with a scalar through its categories, so shared
+    columns are neither decoded nor required to be ordered. Missing rows compare
+    as the missing value, or only satisfy != when it is None.
+    """
+    categories = np.asarray(series.cat.categories, dtype=object)
+    hits = np.asarray(COMPARE[op](categories, value), dtype=bool)
+    on_missing = op == "!=" if missing is None else bool(COMPARE[op](missing, value))
+    # Code -1 marks a missing value and picks the trailing entry
+    lookup = np.append(hits, on_missing)
+    return pd.Series(lookup[series.cat.codes.to_numpy()], index=series.index)
+
+
+def compare(op: str, left, right):
+    """
+    Compare with missing values ordered lowest, as in SAS.
+    """
+    if is_categorical(left) and not isinstance(right, pd.Series):
+        return categorical_compare(op, left, right, missing="")
+    if is_categorical(right) and not isinstance(left, pd.Series):
+        return categorical_compare(FLIPPED[op], right, left, missing="")
+    if is_categorical(left):
+        left = left.astype(object)
+    if is_categorical(right):
+        right = right.astype(object)
+    return COMPARE[op](sas_order(left), sas_order(right))
+
+
+def children(node: Tuple) -> Tuple:
+    """
+    Subexpressions of a node, in the order they are evaluated.
+    """
+    kind = node[0]
+    if kind in ("const", "column"):
+        return ()
+    if kind == "call":
+        return node[2]
+    if kind in ("compare", "binary"):
+        return node[2:]
+    return node[1:]
+
+
+@lru_cache(maxsize=None)
+def referenced(node: Tuple) -> FrozenSet[str]:
+    """
+    Columns an expression reads, used to drop cached subexpressions on assignment.
+    """
+    if node[0] == "column":
+        return frozenset([node[1]])
+    return frozenset().union(*(referenced(c) for c in children(node)))
+
+
+class Evaluator:
+    """
+    Evaluates expression nodes as whole-column operations on one dataframe.
+    Subexpressions in shared are computed once and reused until a column they
+    read is reassigned or the statement holding their last use has run.
+    """
+
+    def __init__(self, df: pd.DataFrame, shared: FrozenSet[Tuple] = frozenset(),
+                 last_use: Optional[Dict[Tuple, int]] = None):
+        self.df = df
+        self.shared = shared
+        self.last_use = last_use or {}
+        self.cache: Dict[Tuple, object] = {}
+
+    def invalidate(self, name: str) -> None:
+        for node in [n for n in self.cache if name in referenced(n)]:
+            del self.cache[node]
+
+    def release(self, step: int) -> None:
+        """
+        Drop cached values that no statement after the given one reads.
+        """
+        for node in [n for n in self.cache if self.last_use.get(n, -1) <= step]:
+            del self.cache[node]
+
+    def eval(self, node: Tuple):
+        if node[0] == "const":
+            return node[1]
+        if node in self.cache:
+            return self.cache[node]
+        with np.errstate(all="ignore"):
+            value = self._eval(node)
+        if node in self.shared:
+            self.cache[node] = value
+        return value
+
+    def _eval(self, node: Tuple):
+        kind = node[0]
+        index = self.df.index
+        if kind == "column":
+            if node[1] not in self.df.columns:
+                raise ValueError(f"Unknown column '{node[1]}'")
+            return self.df[node[1]]
+        if kind == "neg":
+            return -self.eval(node[1])
+        if kind == "not":
+            mask = to_mask(self.eval(node[1]))
+            return ~mask if isinstance(mask, pd.Series) else not mask
+        if kind in ("and", "or"):
+            left, right = to_mask(self.eval(node[1])), to_mask(self.eval(node[2]))
+            if not isinstance(left, pd.Series) and not isinstance(right, pd.Series):
+                return (left and right) if kind == "and" else (left or right)
+            left, right = as_series(left, index), as_series(right, index)
+            return (left & right) if kind == "and" else (left | right)
+        if kind == "compare":
+            return compare(node[1], self.eval(node[2]), self.eval(node[3]))
+        if kind == "binary":
+            op, left, right = node[1], self.eval(node[2]), self.eval(node[3])
+            if op == "||":
+                return text(left, index) + text(right, index)
+            if op == "+":
+                return left + right
+            if op == "-":
+                return left - right
+            if op == "*":
+                return left * right
+            if op == "/":
+                return divide(left, right)
+            if op == "**":
+                return left ** right
+        if kind == "call":
+            func, _, _, form = FUNCTIONS[node[1]]
+            args = [self.eval(a) for a in node[2]]
+            if form == "numeric":
+                return func(*args)
+            if form == "rowwise":
+                return func(index, *args)
+            if form == "concat":
+                return func(*[text(a, index) for a in args])
+            return func(as_series(args[0], index), *args[1:])
+        raise ValueError(f"Unsupported expression: {node}")
+
+    def run(self, stmt: Tuple, mask: Optional[pd.Series] = None) -> None:
+        """
+        Execute a statement, limited to the rows in mask when inside an IF branch.
+        """
+        if stmt[0] == "assign":
+            _, name, expr = stmt
+            value = self.eval(expr)
+            # Comparisons store 1/0, as in SAS
+            if isinstance(value, pd.Series) and value.dtype == bool:
+                value = value.astype(int)
+            elif isinstance(value, (bool, np.bool_)):
+                value = int(value)
+            if mask is None:
+                self.df[name] = value
+            else:
+                new = as_series(value, self.df.index)
+                old = self.df[name] if name in self.df.columns else np.nan
+                self.df[name] = new.where(mask, old)
+            self.invalidate(name)
+        elif stmt[0] == "if":
+            _, cond, then_stmt, else_stmt = stmt
+            cond = as_series(to_mask(self.eval(cond)), self.df.index).fillna(False).astype(bool)
+            self.run(then_stmt, cond if mask is None else mask & cond)
+            if else_stmt is not None:
+                self.run(else_stmt, ~cond if mask is None else mask & ~cond)
+
+
+def check(node: Tuple) -> None:
+    if node[0] == "call":
+        name, args = node[1], node[2]
+        if name not in FUNCTIONS:
+            raise ValueError(f"Unknown function '{name}'")
+        _, low, high, _ = FUNCTIONS[name]
+        if len(args) < low or (high is not None and len(args) > high):
+            raise ValueError(f"Wrong number of arguments to {name}")
+        if name == "SUBSTR" and any(a[0] != "const" for a in args[1:]):
+            raise ValueError("SUBSTR position and length must be constants")
+
+
+def fold(node: Tuple) -> Tuple:
+    """
+    Check an expression and fold constant subexpressions into single constants.
+    """
+    kind = node[0]
+    if kind in ("const", "column"):
+        return node
+    if kind == "call":
+        node = ("call", node[1], tuple(fold(a) for a in node[2]))
+        children = node[2]
+    elif kind in ("compare", "binary"):
+        node = (kind, node[1], fold(node[2]), fold(node[3]))
+        children = node[2:]
+    else:
+        node = (kind,) + tuple(fold(c) for c in node[1:])
+        children = node[1:]
+    check(node)
+    if all(c[0] == "const" for c in children):
+        value = Evaluator(pd.DataFrame(index=pd.RangeIndex(1))).eval(node)
+        if isinstance(value, pd.Series):
+            value = value.iloc[0]
+        if isinstance(value, np.generic):
+            value = value.item()
+        return ("const", value)
+    return node
+
+
+def fold_stmt(stmt: Tuple) -> Tuple:
+    if stmt[0] == "assign":
+        return ("assign", stmt[1], fold(stmt[2]))
+    _, cond, then_stmt, else_stmt = stmt
+    return ("if", fold(cond), fold_stmt(then_stmt),
+            fold_stmt(else_stmt) if else_stmt is not None else None)
+
+
+def freeze(value):
+    # Plans read back from JSON hold lists; the compiler needs hashable tuples
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class Program:
+    """
+    A compiled list of DATA step statements, applied to whole columns at once.
+    Subexpressions evaluated more than once are found here, so only they are
+    cached when the program runs, and only until their last use.
+    """
+
+    def __init__(self, stmts: Tuple):
+        self.stmts = tuple(fold_stmt(s) for s in stmts)
+        shared = set()
+        self.last_use: Dict[Tuple, int] = {}
+        seen = set()
+
+        def visit(node: Tuple, step: int) -> None:
+            if node[0] in ("const", "column"):
+                return
+            self.last_use[node] = step
+            if node in seen:
+                # Served from the cache, so its children are not evaluated again
+                shared.add(node)
+                return
+            seen.add(node)
+            for child in children(node):
+                visit(child, step)
+
+        def walk(stmt: Tuple, step: int) -> None:
+            if stmt[0] == "assign":
+                visit(stmt[2], step)
+                seen.difference_update([n for n in seen if stmt[1] in referenced(n)])
+            else:
+                visit(stmt[1], step)
+                for branch in stmt[2:]:
+                    if branch is not None:
+                        walk(branch, step)
+
+        for step, stmt in enumerate(self.stmts):
+            walk(stmt, step)
+        self.shared = frozenset(shared)
+        self.last_use = {n: i for n, i in self.last_use.items() if n in self.shared}
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        evaluator = Evaluator(df.copy(deep=False), self.shared, self.last_use)
+        for step, stmt in enumerate(self.stmts):
+            evaluator.run(stmt)
+            evaluator.release(step)
+        return evaluator.df
+
+
+@lru_cache(maxsize=128)
+def _compile(stmts: Tuple) -> Program:
+    return Program(stmts)
+
+
+def compile_program(stmts) -> Program:
+    """
+    Compile statements once; repeated steps and per-part reads reuse the program.
+    """
+    return _compile(freeze(stmts))
@@ -0,0 +1,245 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# Rough in-memory budget for the build side of a hash join, in bytes.
+MEMORY_BUDGET = 512 * 1024 * 1024
+
+# Rows read per chunk when streaming the larger side of a join.
+CHUNK_ROWS = 500_000
+
+# A parsed CSV usually takes a few times its on-disk size once loaded.
+CSV_EXPANSION = 3
+
+BUILD_ROW = "__build_row"
+RIGHT_SUFFIX = "__right"
+MATCH = "__match"
+
+
+def estimate_memory(path: str) -> int:
+    """
+    Estimate how many bytes a dataset will take once loaded.
+    """
+    try:
+        return os.path.getsize(path) * CSV_EXPANSION
+    except OSError:
+        return 0
+
+
+def join_type(merge: List[Dict], if_clause: Optional[Dict]) -> str:
+    """
+    Resolve the pandas join type from the IN= flags used in a subsetting IF.
+    Without an IF, MERGE keeps every row from both sides (outer join).
+    """
+    if not if_clause:
+        return "outer"
+    names = if_clause["names"]
+    in_left = merge[0].get("in") in names
+    in_right = merge[1].get("in") in names
+    if not in_left and not in_right:
+        unknown = ", ".join(names)
+        raise ValueError(f"IF references unknown IN= flag: {unknown}")
+    if if_clause.get("op") == "OR":
+        return "outer"
+    if in_left and in_right:
+        return "inner"
+    return "left" if in_left else "right"
+
+
+def read_chunks(path: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Stream a dataset in row chunks. Excel files cannot be streamed and are yielded whole.
+    """
+    ext = Path(path).suffix.lower()
+    if ext == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+    elif ext in (".xls", ".xlsx"):
+        yield pd.read_excel(path)
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
+
+
+def read_header(path: str, sheet: str = None) -> pd.DataFrame:
+    """
+    An empty frame with the dataset's columns.
+    """
+    ext = Path(path).suffix.lower()
+    if ext in (".xls", ".xlsx"):
+        return pd.read_excel(path, sheet_name=sheet or 0, nrows=0)
+    return pd.read_csv(path, nrows=0)
+
+
+def merge_frames(left: pd.DataFrame, right: pd.DataFrame, by: List[str], how: str,
+                 sort: bool = False) -> pd.DataFrame:
+    """
+    Join two frames the way SAS MERGE does: a non-BY column present on both sides
+    appears once, taking the right-hand value wherever a right row matched.
+    """
+    align_keys(left, right, by)
+    joined = pd.merge(left, right, on=by, how=how, sort=sort,
+                      suffixes=("", RIGHT_SUFFIX), indicator=MATCH)
+    has_right = joined[MATCH] != "left_only"
+    overlaps = [c for c in left.columns if c + RIGHT_SUFFIX in joined.columns]
+    for col in overlaps:
+        joined[col] = joined[col + RIGHT_SUFFIX].where(has_right, joined[col])
+    return joined.drop(columns=[MATCH] + [c + RIGHT_SUFFIX for c in overlaps])
+
+
+def hash_join(left_path: str, right_path: str, by: List[str], how: str,
+              build_left: bool, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Load the smaller side into memory and stream the larger side past it chunk by chunk.
+    Unmatched build rows are emitted at the end for joins that keep them.
+    """
+    build_path, probe_path = (left_path, right_path) if build_left else (right_path, left_path)
+    build = pd.concat(list(read_chunks(build_path, chunk_rows)), ignore_index=True)
+    build[BUILD_ROW] = range(len(build))
+
+    build_side = "left" if build_left else "right"
+    probe_side = "right" if build_left else "left"
+    keep_build = how in ("outer", build_side)
+    keep_probe = how in ("outer", probe_side)
+
+    matched = set()
+    probe_empty = None
+    for chunk in read_chunks(probe_path, chunk_rows):
+        if probe_empty is None:
+            probe_empty = chunk.head(0)
+        chunk_how = probe_side if keep_probe else "inner"
+        if build_left:
+            joined = merge_frames(build, chunk, by, chunk_how)
+        else:
+            joined = merge_frames(chunk, build, by, chunk_how)
+        if keep_build:
+            matched.update(joined[BUILD_ROW].dropna().astype(int))
+        yield joined.drop(columns=BUILD_ROW)
+
+    # Also reached when the probe side has no rows, so the header is always produced
+    if keep_build or probe_empty is None:
+        unmatched = build[~build[BUILD_ROW].isin(matched)] if keep_build else build.head(0)
+        if probe_empty is None:
+            probe_empty = read_header(probe_path)
+        if build_left:
+            rest = merge_frames(unmatched, probe_empty, by, "left")
+        else:
+            rest = merge_frames(probe_empty, unmatched, by, "right")
+        yield rest.drop(columns=BUILD_ROW)
+
+
+def partition_keys(df: pd.DataFrame, by: List[str], partitions: int) -> pd.Series:
+    """
+    Hash BY values into partition numbers. Numeric keys are hashed as floats so that
+    a column read as int in one file and float in another lands in the same partition.
+    """
+    keys = pd.DataFrame({
+        c: df[c].astype("float64") if pd.api.types.is_numeric_dtype(df[c]) else df[c].astype(str)
+        for c in by
+    })
+    return pd.util.hash_pandas_object(keys, index=False) % partitions
+
+
+def spill_partitions(path: str, by: List[str], partitions: int, spill_dir: str,
+                     prefix: str, chunk_rows: int = CHUNK_ROWS) -> List[str]:
+    """
+    Split a dataset into hash partitions on disk, one CSV per partition.
+    """
+    paths = [os.path.join(spill_dir, f"{prefix}_{i}.csv") for i in range(partitions)]
+    written = set()
+    header = None
+    for chunk in read_chunks(path, chunk_rows):
+        if header is None:
+            header = chunk.head(0)
+        parts = partition_keys(chunk, by, partitions)
+        for i, part in chunk.groupby(parts.values):
+            part.to_csv(paths[i], mode="a", header=i not in written, index=False)
+            written.add(i)
+    # Keep the header in empty partitions so every pair can still be joined
+    for i in range(partitions):
+        if i not in written:
+            (header if header is not None else pd.DataFrame(columns=by)).to_csv(paths[i], index=False)
+    return paths
+
+
+def align_keys(left: pd.DataFrame, right: pd.DataFrame, by: List[str]) -> None:
+    """
+    Give an empty side the key dtypes of the other so pandas agrees to merge them.
+    """
+    if len(left) and len(right):
+        return
+    empty, other = (left, right) if not len(left) else (right, left)
+    for c in by:
+        empty[c] = empty[c].astype(other[c].dtype)
+
+
+def sort_merge_join(left_path: str, right_path: str, by: List[str], how: str,
+                    partitions: int, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Spill both sides into matching hash partitions, then sort and merge one pair at a time.
+    Only a single partition of each side is held in memory.
+    """
+    spill_dir = tempfile.mkdtemp(prefix="merge_")
+    try:
+        left_parts = spill_partitions(left_path, by, partitions, spill_dir, "left", chunk_rows)
+        right_parts = spill_partitions(right_path, by, partitions, spill_dir, "right", chunk_rows)
+        for left_part, right_part in zip(left_parts, right_parts):
+            left = pd.read_csv(left_part).sort_values(by, kind="mergesort")
+            right = pd.read_csv(right_part).sort_values(by, kind="mergesort")
+            # Empty partitions are yielded too, so the header survives when nothing matches
+            yield merge_frames(left, right, by, how, sort=True)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def merge_datasets(merge: List[Dict], by: List[str], how: str = "outer",
+                   memory_budget: int = MEMORY_BUDGET,
+                   chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Join two datasets BY key columns, yielding the result in chunks.
+    Uses a hash join when the smaller side fits the memory budget and falls back
+    to a partitioned, spill-to-disk sort-merge join when it doesn't.
+    """
+    if not by:
+        raise ValueError("MERGE requires a BY statement")
+    left_path, right_path = merge[0]["path"], merge[1]["path"]
+    left_size = estimate_memory(left_path)
+    right_size = estimate_memory(right_path)
+
+    if min(left_size, right_size) <= memory_budget:
+        return hash_join(left_path, right_path, by, how,
+                         build_left=left_size <= right_size, chunk_rows=chunk_rows)
+
+    partitions = -(-(left_size + right_size) // memory_budget)
+    return sort_merge_join(left_path, right_path, by, how, partitions, chunk_rows)
+
+
+def write_chunks(chunks: Iterator[pd.DataFrame], out_path: str,
+                 transform: Callable[[pd.DataFrame], pd.DataFrame] = lambda df: df,
+                 preview_rows: int = 10) -> Dict:
+    """
+    Stream joined chunks through the DATA step clauses into a CSV file,
+    keeping only a preview and the running shape in memory.
+    """
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    columns = None
+    preview = pd.DataFrame()
+    for chunk in chunks:
+        chunk = transform(chunk)
+        if columns is None:
+            columns = list(chunk.columns)
+            chunk.to_csv(out_path, index=False)
+            preview = chunk.head(preview_rows)
+        else:
+            chunk = chunk.reindex(columns=columns)
+            chunk.to_csv(out_path, mode="a", header=False, index=False)
+            if len(preview) < preview_rows:
+                preview = pd.concat([preview, chunk.head(preview_rows - len(preview))], ignore_index=True)
+        rows += len(chunk)
+    if columns is None:
+        columns = []
+        Path(out_path).write_text("")
+    return {"columns": columns, "preview": preview, "shape": [rows, len(columns)]}
@@ -0,0 +1,126 @@
+import os
+import re
+import glob
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+# Partition values in a part's path: a directory named key=value, e.g. data/event_date=2024-01-05/part.csv,
+# or a file named <dataset>_key=value, e.g. events_event_date=2024-01-05.csv, where the dataset name
+# has no underscore. Keys are SAS names, so they may contain underscores.
+PARTITION_RE = re.compile(r"([A-Za-z_][A-Za-z0-9_]*)=(.+)")
+
+GLOB_CHARS = "*?["
+
+
+def is_pattern(path: str) -> bool:
+    return any(c in path for c in GLOB_CHARS)
+
+
+def expand_paths(paths: List[str]) -> List[str]:
+    """
+    Expand glob patterns into the sorted list of matching files, keeping plain paths as given.
+    """
+    files = []
+    for path in paths:
+        if is_pattern(path):
+            matches = sorted(glob.glob(path))
+            if not matches:
+                raise FileNotFoundError(f"No files match '{path}'")
+            files.extend(matches)
+        else:
+            files.append(path)
+    return files
+
+
+def parse_value(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def partition_values(path: str) -> Dict[str, object]:
+    """
+    Partition columns encoded in a part's path as key=value segments.
+    """
+    *dirs, name = os.path.normpath(path).split(os.sep)
+    stem = os.path.splitext(name)[0]
+    prefix, sep, rest = stem.partition("_")
+    segments = dirs + [rest if sep and "=" not in prefix else stem]
+    values = {}
+    for segment in segments:
+        match = PARTITION_RE.fullmatch(segment)
+        if match:
+            values[match.group(1)] = parse_value(match.group(2))
+    return values
+
+
+def part_matches(values: Dict[str, object], cond: Optional[Dict]) -> bool:
+    """
+    Whether a part can hold rows satisfying the WHERE condition, judged from its
+    partition values alone. Parts without a value for the column are always read.
+    """
+    if not cond or cond["column"] not in values:
+        return True
+    left, right = values[cond["column"]], parse_value(cond["value"])
+    if isinstance(left, str) != isinstance(right, str):
+        left, right = str(left), str(right)
+    op = cond["op"]
+    if op == ">":
+        return left > right
+    elif op == "<":
+        return left < right
+    elif op == "=":
+        return left == right
+    elif op == ">=":
+        return left >= right
+    elif op == "<=":
+        return left <= right
+    elif op == "!=":
+        return left != right
+    return True
+
+
+def prune_parts(files: List[str], cond: Optional[Dict], columns: List[str] = ()) -> List[str]:
+    """
+    Parts that can satisfy cond. A data column named like a partition key takes
+    precedence when the parts are read, so conditions on it never prune.
+    """
+    if cond and cond["column"] in columns:
+        return list(files)
+    return [f for f in files if part_matches(partition_values(f), cond)]
+
+
+def with_partitions(df: pd.DataFrame, path: str) -> pd.DataFrame:
+    """
+    Add a part's partition values as columns, unless the data already has them.
+    """
+    for key, value in partition_values(path).items():
+        if key not in df.columns:
+            df[key] = value
+    return df
+
+
+def read_parts(files: List[str], load: Callable[[str], pd.DataFrame],
+               transform: Callable[[pd.DataFrame], pd.DataFrame] = lambda df: df,
+               max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Read parts concurrently, adding their partition columns and applying the
+    step's clauses to each before concatenating, so filtered-out rows and
+    dropped columns are never held for the whole set.
+    """
+    def read(path: str) -> pd.DataFrame:
+        return transform(with_partitions(load(path), path))
+
+    if not files:
+        return pd.DataFrame()
+    workers = max_workers or min(len(files), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(read, files))
+    return pd.concat(parts, ignore_index=True)
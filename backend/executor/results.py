@@ -0,0 +1,156 @@
+import uuid
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from backend.executor.shared_store import shared_store
+
+# Memory for results and sort orders held in this worker before the least recently used go
+MAX_BYTES = 256 * 1024 * 1024
+
+# Most rows a single page returns, however many are asked for
+MAX_PAGE_ROWS = 1000
+
+
+class ResultCache:
+    """
+    Server-side handles for PROC PRINT results, so clients can page through them
+    without rerunning the script. When the shared dataset store is enabled the
+    results live there, so any worker can serve a page: a result over a dataset the
+    store already holds is recorded as a view of it (its VAR columns and OBS rows),
+    and any other result is copied in. Otherwise, or when a result cannot be shared,
+    it stays in this process. Sort orders are computed once per handle and column.
+    Everything kept in this process counts against max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        # Frames for results kept locally; None for results held in the shared store
+        self._frames: "OrderedDict[str, Optional[pd.DataFrame]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._orders: Dict[Tuple[str, str, bool], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _trim(self) -> None:
+        while self._frames and sum(self._sizes.values()) > self.max_bytes:
+            old_id, _ = self._frames.popitem(last=False)
+            del self._sizes[old_id]
+            for key in [k for k in self._orders if k[0] == old_id]:
+                del self._orders[key]
+
+    def _remember(self, result_id: str, df: Optional[pd.DataFrame], nbytes: int) -> None:
+        with self._lock:
+            self._frames[result_id] = df
+            self._frames.move_to_end(result_id)
+            self._sizes[result_id] = nbytes
+            self._trim()
+
+    def save(self, df: pd.DataFrame, columns: Optional[List[str]] = None,
+             rows: Optional[int] = None) -> Dict:
+        """
+        Keep the result of printing the given columns and leading rows of df.
+        Returns its "result_id", with a "warning" when the result could not be
+        shared between workers or is too large to keep at all.
+        """
+        result_id = uuid.uuid4().hex
+        key = f"result:{result_id}"
+        store = shared_store()
+        if store is not None:
+            source = store.key_of(df)
+            if source is not None and store.put_view(key, source, columns, rows):
+                self._remember(result_id, None, 0)
+                return {"result_id": result_id}
+        result = df if columns is None else df[columns]
+        result = result if rows is None else result.head(rows)
+        result = result.reset_index(drop=True)
+        if store is not None and store.put(key, result):
+            self._remember(result_id, None, 0)
+            return {"result_id": result_id}
+        nbytes = int(result.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return {"result_id": None, "warning": "Result is too large to keep for paging"}
+        self._remember(result_id, result, nbytes)
+        if store is None:
+            return {"result_id": result_id}
+        return {"result_id": result_id,
+                "warning": "Result is too large to share; only this worker can page through it"}
+
+    @contextmanager
+    def _frame(self, result_id: str):
+        """
+        The stored result, or None if the handle is unknown. Shared results are
+        attached for the duration of the block only.
+        """
+        with self._lock:
+            known = result_id in self._frames
+            df = self._frames.get(result_id)
+            if known:
+                self._frames.move_to_end(result_id)
+        store = shared_store()
+        if df is not None or store is None:
+            yield df
+            return
+        key = f"result:{result_id}"
+        df = store.attach(key)
+        if df is None:
+            yield None
+            return
+        if not known:
+            self._remember(result_id, None, 0)
+        try:
+            yield df
+        finally:
+            store.release(key)
+
+    def _order(self, result_id: str, df: pd.DataFrame, sort: str, descending: bool) -> np.ndarray:
+        key = (result_id, sort, descending)
+        with self._lock:
+            order = self._orders.get(key)
+        if order is None:
+            ranked = df[sort].reset_index(drop=True).sort_values(
+                ascending=not descending, kind="mergesort", na_position="last")
+            order = ranked.index.to_numpy()
+            with self._lock:
+                if result_id in self._sizes:
+                    self._orders[key] = order
+                    self._sizes[result_id] += order.nbytes
+                    self._trim()
+        return order
+
+    def page(self, result_id: str, offset: int = 0, limit: int = 50,
+             sort: Optional[str] = None, descending: bool = False) -> Optional[Dict]:
+        """
+        Slice one page of at most MAX_PAGE_ROWS rows out of a stored result,
+        or None if the handle is unknown.
+        """
+        with self._frame(result_id) as df:
+            if df is None:
+                return None
+            if sort is not None and sort not in df.columns:
+                raise KeyError(f"Unknown sort column '{sort}'")
+            offset = max(offset, 0)
+            limit = min(max(limit, 0), MAX_PAGE_ROWS)
+            if sort is not None:
+                rows = df.iloc[self._order(result_id, df, sort, descending)[offset:offset + limit]]
+            else:
+                rows = df.iloc[offset:offset + limit]
+            # Copy the page out so it does not pin the shared mapping
+            rows = rows.reset_index(drop=True).copy()
+            total = len(df)
+            columns = list(df.columns)
+        next_offset = offset + len(rows)
+        return {
+            "result_id": result_id,
+            "columns": columns,
+            "offset": offset,
+            "limit": limit,
+            "total": total,
+            "next_offset": next_offset if next_offset < total else None,
+            "rows": rows,
+        }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,513 @@
+import os
+import json
+import time
+import pickle
+import fcntl
+import weakref
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from multiprocessing import shared_memory, resource_tracker
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Environment variable enabling the store, as a capacity in megabytes
+CAPACITY_ENV = "SAS_SHARED_STORE_MB"
+
+# Size of the shared segment holding the JSON catalog
+CATALOG_BYTES = 1024 * 1024
+
+# dtype kinds stored as raw buffers: bool, ints, floats, complex, timedelta, datetime
+RAW_KINDS = "biufcmM"
+
+# View entries (projections of a stored dataset) kept in the catalog before the oldest go
+MAX_VIEWS = 1000
+
+
+def open_segment(name: str, size: int = 0) -> shared_memory.SharedMemory:
+    """
+    Create or attach a shared memory segment that this store owns.
+    The resource tracker would otherwise unlink it when the creating worker exits.
+    """
+    shm = shared_memory.SharedMemory(name=name, create=size > 0, size=size)
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def destroy_segment(shm: shared_memory.SharedMemory) -> None:
+    shm.close()
+    # unlink() unregisters from the resource tracker, so register it back first
+    resource_tracker.register(shm._name, "shared_memory")
+    shm.unlink()
+
+
+def unlink_segment(name: str) -> None:
+    try:
+        shm = open_segment(name)
+    except FileNotFoundError:
+        return
+    destroy_segment(shm)
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def dataset_key(path: str, sheet: str = None) -> str:
+    """
+    Identify a dataset by its file and modification state, so edits load a fresh copy.
+    """
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{sheet or ''}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+class SharedDatasetStore:
+    """
+    Dataset cache in POSIX shared memory, shared by every worker process on the host.
+
+    Numeric columns are stored as raw buffers. Columns holding only strings are
+    stored as dictionary codes plus their categories and come back as Categoricals
+    over the shared codes, so both are attached without copying; comparisons on
+    them go through the categories (see expressions.categorical_compare). Any other
+    column (mixed, categorical, dates as objects, nullable) is pickled and rebuilt
+    in each process that attaches it, with its values and dtype intact. A small
+    JSON catalog in its own segment records the layout of each dataset, how many
+    references each process holds, and when it was last used.
+    """
+
+    def __init__(self, prefix: str = "sas", capacity: int = 1024 * 1024 * 1024):
+        self.prefix = prefix
+        self.capacity = capacity
+        self.lock_path = Path(tempfile.gettempdir()) / f"{prefix}_store.lock"
+        self._segments: Dict[str, List[shared_memory.SharedMemory]] = {}
+        # Arrays viewing each key's mappings; numpy does not pin the mapping itself,
+        # so it may only be closed once all of them are gone
+        self._views: Dict[str, List[weakref.ref]] = {}
+        # References this process holds per key, and mappings waiting for their views to go
+        self._local_refs: Dict[str, int] = {}
+        self._pending: List[Tuple[List[shared_memory.SharedMemory], List[weakref.ref]]] = []
+        # Frames handed out by attach, so callers can find which key a frame came from
+        self._attached: Dict[int, Tuple[weakref.ref, str]] = {}
+        self._local = threading.Lock()
+        with self._locked():
+            try:
+                self._catalog_shm = open_segment(f"{prefix}_catalog")
+            except FileNotFoundError:
+                self._catalog_shm = open_segment(f"{prefix}_catalog", CATALOG_BYTES)
+                self._write_catalog({})
+
+    # ----- catalog -----
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _read_catalog(self) -> Dict:
+        buf = self._catalog_shm.buf
+        length = int.from_bytes(bytes(buf[:4]), "little")
+        return json.loads(bytes(buf[4:4 + length]) or b"{}")
+
+    def _write_catalog(self, catalog: Dict) -> None:
+        data = json.dumps(catalog).encode("utf-8")
+        if len(data) + 4 > self._catalog_shm.size:
+            raise MemoryError("Shared dataset catalog is full")
+        self._catalog_shm.buf[4:4 + len(data)] = data
+        self._catalog_shm.buf[:4] = len(data).to_bytes(4, "little")
+
+    def _fits(self, catalog: Dict) -> bool:
+        return len(json.dumps(catalog).encode("utf-8")) + 4 <= self._catalog_shm.size
+
+    def _segment_name(self, key: str, i: int) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+        return f"{self.prefix}_{digest}_{i}"
+
+    # ----- storing -----
+
+    def _put_locked(self, catalog: Dict, key: str, df: pd.DataFrame) -> bool:
+        arrays = []
+        columns = []
+        for col in df.columns:
+            series = df[col]
+            if isinstance(series.dtype, np.dtype) and series.dtype.kind in RAW_KINDS:
+                arr = np.ascontiguousarray(series.to_numpy())
+                columns.append({"name": str(col), "kind": "raw", "dtype": arr.dtype.str,
+                                "segment": len(arrays)})
+                arrays.append(arr)
+            elif pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+                cat = pd.Categorical(series.astype(object).where(series.notna(), None))
+                codes = np.ascontiguousarray(cat.codes)
+                categories = json.dumps(list(cat.categories)).encode("utf-8")
+                blob = np.frombuffer(categories, dtype=np.uint8)
+                columns.append({"name": str(col), "kind": "dict", "dtype": codes.dtype.str,
+                                "segment": len(arrays), "categories": len(arrays) + 1,
+                                "categories_len": len(blob)})
+                arrays.extend([codes, blob])
+            else:
+                # Mixed, categorical and extension columns keep their exact values and dtype
+                blob = np.frombuffer(pickle.dumps(series.reset_index(drop=True),
+                                                  protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+                columns.append({"name": str(col), "kind": "pickle", "segment": len(arrays),
+                                "length": len(blob)})
+                arrays.append(blob)
+
+        nbytes = sum(arr.nbytes for arr in arrays)
+        if nbytes > self.capacity:
+            return False
+        self._evict_locked(catalog, nbytes)
+
+        names = [self._segment_name(key, i) for i in range(len(arrays))]
+        for col in columns:
+            col["segment"] = names[col["segment"]]
+            if "categories" in col:
+                col["categories"] = names[col["categories"]]
+        catalog[key] = {
+            "rows": len(df),
+            "columns": columns,
+            "segments": names,
+            "nbytes": nbytes,
+            "refs": {},
+            "last_used": time.time(),
+        }
+        # Check the catalog can record the dataset before creating any segment,
+        # since segments it does not list would never be unlinked
+        if not self._fits(catalog):
+            del catalog[key]
+            return False
+
+        created = []
+        try:
+            for name, arr in zip(names, arrays):
+                # A worker that died mid-put may have left a segment behind
+                unlink_segment(name)
+                shm = open_segment(name, max(arr.nbytes, 1))
+                created.append(name)
+                np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[:] = arr
+                shm.close()
+        except BaseException:
+            for name in created:
+                unlink_segment(name)
+            del catalog[key]
+            raise
+        return True
+
+    def put(self, key: str, df: pd.DataFrame) -> bool:
+        """
+        Copy a dataframe into shared memory under the given key. Returns False if
+        it was not stored: it is larger than the whole store, or the catalog is full.
+        """
+        self._sweep()
+        with self._locked():
+            catalog = self._read_catalog()
+            if key in catalog:
+                return True
+            stored = self._put_locked(catalog, key, df)
+            # Written either way: making room may have evicted other datasets
+            self._write_catalog(catalog)
+            return stored
+
+    def put_view(self, key: str, source: str, columns: Optional[List[str]] = None,
+                 rows: Optional[int] = None) -> bool:
+        """
+        Store a projection of an already stored dataset under a new key without
+        copying any data: attaching the key returns the source restricted to the
+        given columns and leading rows. The view goes when its source is evicted.
+        Returns False if the source is not stored or the catalog is full.
+        """
+        with self._locked():
+            catalog = self._read_catalog()
+            if source not in catalog or "source" in catalog[source]:
+                return False
+            views = sorted((k for k, e in catalog.items() if "source" in e),
+                           key=lambda k: catalog[k]["last_used"])
+            for old in views[:max(len(views) - MAX_VIEWS + 1, 0)]:
+                self._drop_locked(catalog, old)
+            catalog[key] = {
+                "source": source,
+                "columns": columns,
+                "rows": rows,
+                "segments": [],
+                "nbytes": 0,
+                "refs": {},
+                "last_used": time.time(),
+            }
+            stored = self._fits(catalog)
+            if not stored:
+                del catalog[key]
+            self._write_catalog(catalog)
+            return stored
+
+    def key_of(self, df: pd.DataFrame) -> Optional[str]:
+        """
+        The key a frame returned by attach was stored under, or None for any other frame.
+        """
+        with self._local:
+            found = self._attached.get(id(df))
+        if found is None or found[0]() is not df:
+            return None
+        return found[1]
+
+    # ----- attaching -----
+
+    def _attach_locked(self, catalog: Dict, key: str) -> pd.DataFrame:
+        entry = catalog[key]
+        self._sweep()
+        with self._local:
+            segments = self._segments.get(key)
+            if segments is None:
+                segments = [open_segment(name) for name in entry["segments"]]
+                self._segments[key] = segments
+            self._local_refs[key] = self._local_refs.get(key, 0) + 1
+            views = [ref for ref in self._views.get(key, []) if ref() is not None]
+            self._views[key] = views
+        by_name = {shm.name.lstrip("/"): shm for shm in segments}
+        rows = entry["rows"]
+
+        def view(name: str, dtype, count: int) -> np.ndarray:
+            arr = np.ndarray((count,), dtype=np.dtype(dtype), buffer=by_name[name].buf)
+            arr.flags.writeable = False
+            # Views taken from this array keep it as their base, so it outlives them
+            views.append(weakref.ref(arr))
+            return arr
+
+        data = {}
+        for col in entry["columns"]:
+            if col["kind"] == "raw":
+                data[col["name"]] = view(col["segment"], col["dtype"], rows)
+            elif col["kind"] == "dict":
+                blob = view(col["categories"], np.uint8, col["categories_len"])
+                categories = json.loads(blob.tobytes().decode("utf-8"))
+                data[col["name"]] = pd.Categorical.from_codes(
+                    view(col["segment"], col["dtype"], rows),
+                    dtype=pd.CategoricalDtype(categories), validate=False)
+            else:
+                blob = view(col["segment"], np.uint8, col["length"])
+                data[col["name"]] = pickle.loads(blob.tobytes()).array
+
+        pid = str(os.getpid())
+        entry["refs"][pid] = entry["refs"].get(pid, 0) + 1
+        entry["last_used"] = time.time()
+        df = pd.DataFrame(data, copy=False)
+        with self._local:
+            self._attached = {i: a for i, a in self._attached.items() if a[0]() is not None}
+            self._attached[id(df)] = (weakref.ref(df), key)
+        return df
+
+    def attach(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Return a zero-copy, read-only view of a stored dataset and take a reference to it,
+        or None if the key is not stored.
+        """
+        with self._locked():
+            catalog = self._read_catalog()
+            entry = catalog.get(key)
+            if entry is None:
+                return None
+            if "source" not in entry:
+                df = self._attach_locked(catalog, key)
+            elif entry["source"] in catalog:
+                entry["last_used"] = time.time()
+                df = self._attach_locked(catalog, entry["source"])
+                if entry["columns"] is not None:
+                    df = df[entry["columns"]]
+                if entry["rows"] is not None:
+                    df = df.iloc[:entry["rows"]]
+            else:
+                return None
+            self._write_catalog(catalog)
+            return df
+
+    def get_or_load(self, key: str, loader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Attach to a stored dataset, loading and storing it first if no worker has yet.
+        """
+        df = self.attach(key)
+        if df is not None:
+            return df
+        loaded = loader()
+        with self._locked():
+            catalog = self._read_catalog()
+            if key not in catalog and not self._put_locked(catalog, key, loaded):
+                # Larger than the whole store, or no room in the catalog;
+                # serve it from this worker's memory
+                self._write_catalog(catalog)
+                return loaded
+            df = self._attach_locked(catalog, key)
+            self._write_catalog(catalog)
+        return df
+
+    def release(self, key: str) -> None:
+        """
+        Drop one reference this process holds on a dataset, making it evictable once unused.
+        When this process holds no more references its mapping is closed, as soon as no
+        frame views it any longer.
+        """
+        with self._locked():
+            catalog = self._read_catalog()
+            if "source" in catalog.get(key, {}):
+                # References taken through a view are held on its source
+                key = catalog[key]["source"]
+            entry = catalog.get(key)
+            if entry is not None:
+                pid = str(os.getpid())
+                count = entry["refs"].get(pid, 0) - 1
+                if count > 0:
+                    entry["refs"][pid] = count
+                else:
+                    entry["refs"].pop(pid, None)
+                self._write_catalog(catalog)
+        with self._local:
+            count = self._local_refs.get(key, 0) - 1
+            if count > 0:
+                self._local_refs[key] = count
+            else:
+                self._local_refs.pop(key, None)
+        if count <= 0:
+            self._close_local(key)
+
+    # ----- eviction -----
+
+    def _evict_locked(self, catalog: Dict, needed: int) -> None:
+        for entry in catalog.values():
+            entry["refs"] = {pid: n for pid, n in entry["refs"].items() if pid_alive(int(pid))}
+        used = sum(entry["nbytes"] for entry in catalog.values())
+        idle = sorted((k for k, e in catalog.items() if not e["refs"] and "source" not in e),
+                      key=lambda k: catalog[k]["last_used"])
+        for key in idle:
+            if used + needed <= self.capacity:
+                break
+            used -= catalog[key]["nbytes"]
+            self._drop_locked(catalog, key)
+
+    def _drop_locked(self, catalog: Dict, key: str) -> None:
+        entry = catalog.pop(key)
+        for view in [k for k, e in catalog.items() if e.get("source") == key]:
+            del catalog[view]
+        for name in entry["segments"]:
+            unlink_segment(name)
+        with self._local:
+            self._local_refs.pop(key, None)
+        self._close_local(key)
+
+    def _close_local(self, key: str) -> None:
+        with self._local:
+            segments = self._segments.pop(key, None)
+            views = self._views.pop(key, [])
+            if segments:
+                self._pending.append((segments, views))
+        self._sweep()
+
+    def _sweep(self) -> None:
+        """
+        Close mappings no longer needed by this process. Ones that frames still view
+        are kept until those frames are collected and retried on the next call.
+        """
+        with self._local:
+            pending, self._pending = self._pending, []
+        still_viewed = []
+        for segments, views in pending:
+            if any(ref() is not None for ref in views):
+                still_viewed.append((segments, views))
+                continue
+            for shm in segments:
+                shm.close()
+        with self._local:
+            self._pending.extend(still_viewed)
+
+    def evict(self, key: str) -> bool:
+        """
+        Remove a dataset from shared memory regardless of references. Workers that still
+        hold frames keep their mapping until they drop them and release the dataset.
+        """
+        with self._locked():
+            catalog = self._read_catalog()
+            if key not in catalog:
+                return False
+            self._drop_locked(catalog, key)
+            self._write_catalog(catalog)
+            return True
+
+    def keys(self) -> List[str]:
+        with self._locked():
+            return list(self._read_catalog())
+
+    def clear(self) -> None:
+        """
+        Remove every dataset and the catalog itself.
+        """
+        with self._locked():
+            catalog = self._read_catalog()
+            for key in list(catalog):
+                if key in catalog:
+                    self._drop_locked(catalog, key)
+            destroy_segment(self._catalog_shm)
+
+
+_store: Optional[SharedDatasetStore] = None
+_session = threading.local()
+
+
+def shared_store() -> Optional[SharedDatasetStore]:
+    """
+    Process-wide store, enabled by setting SAS_SHARED_STORE_MB to a capacity in megabytes.
+    """
+    global _store
+    capacity = os.environ.get(CAPACITY_ENV)
+    if not capacity:
+        return None
+    if _store is None:
+        _store = SharedDatasetStore(capacity=int(capacity) * 1024 * 1024)
+    return _store
+
+
+def load_shared(path: str, sheet: str, loader: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """
+    Load a dataset through the shared store when it is enabled. References taken
+    inside a dataset_session are held until the session ends; outside one they are
+    dropped at once, since the attached mapping stays valid even after eviction.
+    """
+    store = shared_store()
+    if store is None:
+        return loader()
+    key = dataset_key(path, sheet)
+    df = store.get_or_load(key, loader)
+    keys = getattr(_session, "keys", None)
+    if keys is not None:
+        keys.append(key)
+    else:
+        store.release(key)
+    return df
+
+
+@contextmanager
+def dataset_session():
+    """
+    Release every shared dataset attached inside the block when it exits,
+    so datasets become evictable once a request is done with them.
+    """
+    _session.keys = []
+    try:
+        yield
+    finally:
+        keys, _session.keys = _session.keys, None
+        store = shared_store()
+        if store is not None:
+            for key in keys:
+                store.release(key)
@@ -0,0 +1,198 @@
+import os
+import json
+import fcntl
+import pickle
+import hashlib
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Step results are cached here, shared by every worker on the host
+CACHE_DIR = "cache/steps"
+
+# Total size of cached results before the least recently used are removed
+MAX_BYTES = 256 * 1024 * 1024
+
+
+def fingerprint(path: str) -> str:
+    """
+    Identify a file by its location, size and modification time.
+    """
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class StepCache:
+    """
+    Persistent cache of whole step outputs, addressed by a hash of the normalized
+    step plan, the fingerprints of its input datasets and the output options.
+    Entries are pickle files written atomically, so workers can share the directory
+    and entries survive restarts. Hits refresh the file's mtime, which drives LRU
+    eviction once the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def key(self, plan: Dict, inputs: Iterable[str], **options) -> Optional[str]:
+        """
+        Content address of a step, or None if an input cannot be fingerprinted.
+        """
+        try:
+            prints = [fingerprint(p) for p in inputs]
+        except OSError:
+            return None
+        normalized = json.dumps({"plan": plan, "inputs": prints, "options": options},
+                                sort_keys=True, default=str)
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.pkl"
+
+    @contextmanager
+    def _locked(self):
+        # Serializes writers across workers, so two workers finishing the same step
+        # cannot both believe they own the entry
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / ".lock", "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _load(self, path: Path, result: bool = True) -> Optional[Dict]:
+        """
+        Read an entry. Its header (the recorded outputs and their total size) is
+        pickled ahead of the result, so it can be read without loading the result.
+        """
+        try:
+            with open(path, "rb") as fh:
+                entry = pickle.load(fh)
+                if result:
+                    entry["result"] = pickle.load(fh)
+                return entry
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError):
+            return None
+
+    def _valid(self, entry: Optional[Dict]) -> bool:
+        if entry is None:
+            return False
+        for out_path, expected in entry["outputs"].items():
+            try:
+                if fingerprint(out_path) != expected:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """
+        Return the cached entry, holding the step's "result" and the fingerprints of
+        its "outputs" by path, or None on a miss. Entries whose recorded output files
+        have since changed or disappeared count as misses.
+        """
+        path = self._path(key)
+        entry = self._load(path)
+        if not self._valid(entry):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached result, or None on a miss.
+        """
+        entry = self.lookup(key)
+        return None if entry is None else entry["result"]
+
+    def put(self, key: str, result: Any, outputs: Iterable[str] = ()) -> bool:
+        """
+        Store a step result, recording the fingerprints of files the step wrote.
+        The entry owns those files from then on: evicting it deletes them, and they
+        count towards max_bytes. Returns False, leaving the files with the caller,
+        if another worker already stored a valid entry for the same key.
+        """
+        outputs = list(outputs)
+        header = {"outputs": {p: fingerprint(p) for p in outputs},
+                  "output_bytes": sum(os.path.getsize(p) for p in outputs)}
+        with self._locked():
+            if self._valid(self._load(self._path(key), result=False)):
+                return False
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    pickle.dump(header, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                    pickle.dump(result, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self._path(key))
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+        self.evict()
+        return True
+
+    def _entries(self) -> List[Tuple[Path, float, int]]:
+        """
+        Every entry with its last use and the bytes it holds, output files included.
+        """
+        entries = []
+        for path in self.directory.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            header = self._load(path, result=False) or {}
+            entries.append((path, stat.st_mtime, stat.st_size + header.get("output_bytes", 0)))
+        return entries
+
+    def _remove(self, path: Path) -> None:
+        """
+        Remove an entry along with the output files it recorded, unless a later
+        step has since rewritten them.
+        """
+        entry = self._load(path, result=False)
+        path.unlink(missing_ok=True)
+        for out_path, expected in (entry or {}).get("outputs", {}).items():
+            try:
+                if fingerprint(out_path) == expected:
+                    os.unlink(out_path)
+                os.rmdir(os.path.dirname(out_path))
+            except OSError:
+                pass
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until the cache and the files its
+        entries own fit in max_bytes.
+        """
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        used = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if used <= self.max_bytes:
+                break
+            self._remove(path)
+            used -= size
+
+    def invalidate(self, key: str) -> bool:
+        path = self._path(key)
+        if not path.exists():
+            return False
+        self._remove(path)
+        return True
+
+    def clear(self) -> int:
+        """
+        Remove every cached result and return how many were removed.
+        """
+        entries = self._entries()
+        for path, _, _ in entries:
+            self._remove(path)
+        return len(entries)
+
+
+step_cache = StepCache()
@@ -1,6 +1,7 @@
 import re
 from lark import Lark, Transformer, v_args
 from pathlib import Path
+from backend.executor.partitions import is_pattern
 
 # Load grammar from the same directory as this file
 grammar_text = Path(__file__).with_name("grammar.lark").read_text()
@@ -19,8 +20,38 @@ class ToPlan(Transformer):
                 block.update(clause)
         return block
 
-    def set_stmt(self, path, sheet=None):
-        return {"path": str(path), "sheet": str(sheet) if sheet else None}
+    def set_stmt(self, *items):
+        sources = [i for i in items if isinstance(i, str)]
+        sheet = next((i["sheet"] for i in items if isinstance(i, dict)), None)
+        # A single plain file keeps the original plan shape
+        if len(sources) == 1 and not is_pattern(sources[0]):
+            return {"path": sources[0], "sheet": sheet}
+        return {"paths": sources, "sheet": sheet}
+
+    def set_source(self, source):
+        return str(source)
+
+    def sheet_opt(self, name):
+        return {"sheet": str(name)}
+
+    def merge_stmt(self, left, right):
+        return {"merge": [left, right]}
+
+    def merge_ds(self, path, in_name=None):
+        return {"path": str(path), "in": in_name}
+
+    def in_opt(self, name):
+        return str(name)
+
+    def by_stmt(self, *cols):
+        return {"by": [str(c) for c in cols]}
+
+    def if_stmt(self, expr):
+        return {"if": expr}
+
+    def in_expr(self, first, op=None, second=None):
+        names = [str(first)] + ([str(second)] if second else [])
+        return {"names": names, "op": str(op).upper() if op else "AND"}
 
     def where_stmt(self, cond):
         return {"where": cond}
@@ -28,6 +59,52 @@ class ToPlan(Transformer):
     def condition(self, name, op, value):
         return {"column": str(name), "op": str(op), "value": str(value)}
 
+    # ----- Assignments and IF-THEN-ELSE -----
+    # Expressions become nested tuples, compiled by backend.executor.expressions
+
+    def compute_block(self, *stmts):
+        return {"compute": tuple(stmts)}
+
+    def assign_stmt(self, name, expr):
+        return ("assign", str(name), expr)
+
+    def ifthen_stmt(self, cond, then_stmt, else_stmt=None):
+        return ("if", cond, then_stmt, else_stmt)
+
+    def or_op(self, left, right):
+        return ("or", left, right)
+
+    def and_op(self, left, right):
+        return ("and", left, right)
+
+    def not_op(self, operand):
+        return ("not", operand)
+
+    def compare(self, left, op, right):
+        return ("compare", str(op), left, right)
+
+    def binary(self, left, op, right):
+        return ("binary", str(op), left, right)
+
+    def pow_op(self, base, exponent):
+        return ("binary", "**", base, exponent)
+
+    def neg(self, operand):
+        return ("neg", operand)
+
+    def number(self, token):
+        value = float(token)
+        return ("const", int(value) if value.is_integer() and str(token).isdigit() else value)
+
+    def string(self, text):
+        return ("const", str(text))
+
+    def column(self, name):
+        return ("column", str(name))
+
+    def call(self, name, *args):
+        return ("call", str(name).upper(), tuple(a for a in args if a is not None))
+
     def keep_stmt(self, *cols):
         return {"keep": [str(c) for c in cols]}
 
@@ -40,6 +117,11 @@ class ToPlan(Transformer):
     def rename_stmt(self, *pairs):
         return {"rename": list(pairs)}
 
+    # ----- PROCs -----
+
+    def proc_stmt(self, proc):
+        return proc
+
     # ----- PROC PRINT -----
 
     def var_stmt(self, *cols):
@@ -100,6 +182,9 @@ class ToPlan(Transformer):
     def PATH(self, token):
         return token.value
 
+    def ESCAPED_STRING(self, token):
+        return token.value[1:-1]
+
 def parse_script(text: str):
     tree = parser.parse(text)
     transformer = ToPlan()
@@ -0,0 +1,19 @@
+import importlib
+import pytest
+from backend.executor import data_step, shared_store
+from backend.executor.step_cache import StepCache
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch):
+    # Keep step cache entries and WORK datasets out of the working tree and independent between runs
+    app_module = importlib.import_module("backend.app")
+    monkeypatch.setattr(app_module, "step_cache", StepCache(directory=str(tmp_path / "step_cache")))
+    monkeypatch.setattr(data_step, "WORK_DIR", str(tmp_path / "work"))
+
+
+@pytest.fixture(autouse=True)
+def no_shared_store(monkeypatch):
+    # Tests run without the shared store unless they install one, whatever the environment says
+    monkeypatch.delenv(shared_store.CAPACITY_ENV, raising=False)
+    monkeypatch.setattr(shared_store, "_store", None)
@@ -67,3 +67,46 @@ def test_multiple_renames():
     for row in data["preview"]:
         assert "employee_name" in row
         assert "salary" in row
+
+def print_result(tmp_path, proc_options=""):
+    path = tmp_path / "scores.csv"
+    path.write_text("id,score\n" + "".join(f"{i},{(i * 7) % 100}\n" for i in range(200)))
+    script = f"""
+    DATA scores;
+    SET {path};
+    RUN;
+    PROC PRINT {proc_options}; RUN;
+    """
+    response = client.post("/run-script", json={"code": script, "limit": 5})
+    assert response.status_code == 200
+    return response.json()["results"][1]
+
+def test_proc_print_returns_result_handle(tmp_path):
+    output = print_result(tmp_path)
+    assert output["shape"] == [200, 2]
+    assert len(output["preview"]) == 5
+    assert output["result_id"]
+
+def test_results_pagination(tmp_path):
+    result_id = print_result(tmp_path)["result_id"]
+    response = client.get(f"/results/{result_id}", params={"offset": 190, "limit": 50})
+    assert response.status_code == 200
+    page = response.json()
+    assert page["total"] == 200
+    assert [row["id"] for row in page["rows"]] == list(range(190, 200))
+    assert page["next_offset"] is None
+
+def test_results_sorted_page(tmp_path):
+    result_id = print_result(tmp_path)["result_id"]
+    response = client.get(f"/results/{result_id}",
+                          params={"offset": 0, "limit": 3, "sort": "score", "descending": True})
+    page = response.json()
+    assert [row["score"] for row in page["rows"]] == [99, 99, 98]
+    assert page["next_offset"] == 3
+
+def test_results_gzip_and_unknown_id(tmp_path):
+    result_id = print_result(tmp_path)["result_id"]
+    response = client.get(f"/results/{result_id}", params={"limit": 200},
+                          headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert client.get("/results/missing").status_code == 404
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backend.parser.parser import parse_script
+from backend.executor import expressions
+from backend.executor.data_step import apply_clauses
+from backend.executor.expressions import compile_program
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        "name": ["Alice", "Bob", "Carol", "Bob"],
+        "age": [25, 35, 41, 35],
+        "income": [48000, 52000, 68000, 0],
+    })
+
+
+def run(df, statements):
+    plan = parse_script(f"DATA m; SET a.csv; {statements} RUN;")[0]
+    return apply_clauses(df, plan)
+
+
+def test_arithmetic_and_functions(sample_df):
+    out = run(sample_df, "ratio = ROUND(income / age, 0.01); lg = LOG(income); z = age / 0;")
+    assert out["ratio"].tolist() == [1920.0, 1485.71, 1658.54, 0.0]
+    assert out["lg"].iloc[0] == pytest.approx(np.log(48000))
+    assert np.isnan(out["lg"].iloc[3])
+    assert out["z"].isna().all()
+
+
+def test_comparison_stores_one_zero(sample_df):
+    out = run(sample_df, "rich = income > 50000;")
+    assert out["rich"].tolist() == [0, 1, 1, 0]
+
+
+def test_if_then_else_chain(sample_df):
+    out = run(sample_df, 'IF age > 40 THEN grp = "old"; ELSE IF age > 30 THEN grp = "mid"; ELSE grp = "young";')
+    assert out["grp"].tolist() == ["young", "mid", "old", "mid"]
+
+
+def test_string_functions(sample_df):
+    out = run(sample_df, 'code = UPCASE(SUBSTR(name, 1, 3)) || "-" || LOWCASE(name);')
+    assert out["code"].tolist() == ["ALI-alice", "BOB-bob", "CAR-carol", "BOB-bob"]
+
+
+def test_assignment_sees_earlier_assignment(sample_df):
+    out = run(sample_df, "age = age + 1; double = age * 2;")
+    assert out["double"].tolist() == [52, 72, 84, 72]
+    assert sample_df["age"].tolist() == [25, 35, 41, 35]
+
+
+def test_assignments_run_before_keep(sample_df):
+    plan = parse_script("DATA m; SET a.csv; WHERE age > 30; bonus = income * 0.1; KEEP name, bonus; RUN;")[0]
+    out = apply_clauses(sample_df, plan)
+    assert list(out.columns) == ["name", "bonus"]
+    assert out["bonus"].tolist() == [5200.0, 6800.0, 0.0]
+
+
+def test_constant_folding():
+    plan = parse_script("DATA m; SET a.csv; k = 2 * 3 + LOG(1); RUN;")[0]
+    program = compile_program(plan["compute"])
+    assert program.stmts == (("assign", "k", ("const", 6.0)),)
+
+
+def test_shared_subexpressions_computed_once(sample_df, monkeypatch):
+    calls = []
+    log = expressions.FUNCTIONS["LOG"]
+    counted = (lambda x: calls.append(1) or log[0](x),) + log[1:]
+    monkeypatch.setitem(expressions.FUNCTIONS, "LOG", counted)
+    expressions._compile.cache_clear()
+    out = run(sample_df, "a = LOG(age) + 1; b = LOG(age) * 2;")
+    assert len(calls) == 1
+    assert out["b"].iloc[0] == pytest.approx(2 * np.log(25))
+
+
+def test_unknown_function_rejected(sample_df):
+    with pytest.raises(ValueError, match="Unknown function"):
+        run(sample_df, "x = NOPE(age);")
+
+
+def test_later_proc_sees_derived_columns(tmp_path):
+    import importlib
+    from fastapi.testclient import TestClient
+    app_module = importlib.import_module("backend.app")
+    path = tmp_path / "emp.csv"
+    path.write_text("name,age\nAlice,25\nBob,35\n")
+    script = f"DATA m; SET {path}; dbl = age * 2; RUN; PROC PRINT; RUN;"
+    result = TestClient(app_module.app).post("/run-script", json={"code": script}).json()
+    printed = result["results"][1]
+    assert "dbl" in printed["columns"]
+    assert [row["dbl"] for row in printed["preview"]] == [50, 70]
+    assert path.read_text() == "name,age\nAlice,25\nBob,35\n"
+
+
+def test_only_repeated_subexpressions_cached_until_last_use(sample_df, monkeypatch):
+    plan = parse_script("DATA m; SET a.csv; a = LOG(age) + 1; b = LOG(age) * 2; c = age + 1; RUN;")[0]
+    program = compile_program(plan["compute"])
+    log_age = ("call", "LOG", (("column", "age"),))
+    assert program.shared == frozenset([log_age])
+    assert program.last_use == {log_age: 1}
+
+    cached = []
+    release = expressions.Evaluator.release
+
+    def spy(self, step):
+        release(self, step)
+        cached.append(set(self.cache))
+
+    monkeypatch.setattr(expressions.Evaluator, "release", spy)
+    program(sample_df)
+    assert cached == [{log_age}, set(), set()]
+
+
+def test_missing_results_served_as_null(tmp_path):
+    import importlib
+    from fastapi.testclient import TestClient
+    client = TestClient(importlib.import_module("backend.app").app)
+    path = tmp_path / "emp.csv"
+    path.write_text("name,age\nAlice,25\nBob,0\n")
+    script = f"DATA m; SET {path}; y = LOG(age); r = 1 / age; RUN; PROC PRINT; RUN;"
+    response = client.post("/run-script", json={"code": script})
+    assert response.status_code == 200
+    step, printed = response.json()["results"]
+    assert step["preview"][1]["y"] is None and step["preview"][1]["r"] is None
+    assert printed["preview"][1]["y"] is None
+    page = client.get(f"/results/{printed['result_id']}").json()
+    assert page["rows"][1]["r"] is None
+
+
+def test_else_pairs_with_nearest_if():
+    df = pd.DataFrame({"x": [1, 2, 3]})
+    out = run(df, "IF x > 1 THEN IF x > 2 THEN y = 1; ELSE y = 2;")
+    assert out["y"].isna().tolist() == [True, False, False]
+    assert out["y"].tolist()[1:] == [2, 1]
+    out = run(df, "IF x > 1 THEN IF x > 2 THEN y = 1; ELSE y = 2; ELSE y = 3;")
+    assert out["y"].tolist() == [3, 2, 1]
+
+
+def test_missing_compares_lowest():
+    df = pd.DataFrame({"x": [np.nan, 3.0, 7.0], "s": ["b", None, "a"]})
+    out = run(df, "lt = x < 5; ge = x >= 0; eq = x = x; sl = s < \"a\";")
+    assert out["lt"].tolist() == [1, 1, 0]
+    assert out["ge"].tolist() == [0, 1, 1]
+    assert out["eq"].tolist() == [1, 1, 1]
+    assert out["sl"].tolist() == [0, 1, 0]
@@ -0,0 +1,124 @@
+import importlib
+import pandas as pd
+from fastapi.testclient import TestClient
+from backend.parser.parser import parse_script
+from backend.executor import data_step
+from backend.executor.merge import join_type, merge_datasets
+
+
+def write_inputs(tmp_path):
+    left = pd.DataFrame({"id": [1, 2, 3, 4], "name": ["Alice", "Bob", "Carol", "Dan"]})
+    right = pd.DataFrame({"id": [2, 3, 3, 5], "amount": [10, 20, 30, 40]})
+    left_path, right_path = tmp_path / "left.csv", tmp_path / "right.csv"
+    left.to_csv(left_path, index=False)
+    right.to_csv(right_path, index=False)
+    return str(left_path), str(right_path)
+
+
+def collect(chunks):
+    df = pd.concat(list(chunks), ignore_index=True)
+    return df.sort_values(["id", "amount"]).reset_index(drop=True)
+
+
+def test_parse_merge_by_in():
+    script = """
+    DATA joined;
+    MERGE data/a.csv (in=ina) data/b.csv (in=inb);
+    BY id;
+    IF ina AND inb;
+    RUN;
+    """
+    block = parse_script(script)[0]
+    assert block["merge"] == [{"path": "data/a.csv", "in": "ina"}, {"path": "data/b.csv", "in": "inb"}]
+    assert block["by"] == ["id"]
+    assert join_type(block["merge"], block["if"]) == "inner"
+
+
+def test_join_type_from_in_flags():
+    merge = [{"path": "a.csv", "in": "ina"}, {"path": "b.csv", "in": "inb"}]
+    assert join_type(merge, None) == "outer"
+    assert join_type(merge, {"names": ["ina"], "op": "AND"}) == "left"
+    assert join_type(merge, {"names": ["inb"], "op": "AND"}) == "right"
+    assert join_type(merge, {"names": ["ina", "inb"], "op": "OR"}) == "outer"
+
+
+def test_hash_join_matches_pandas(tmp_path):
+    left_path, right_path = write_inputs(tmp_path)
+    merge = [{"path": left_path}, {"path": right_path}]
+    for how in ("inner", "left", "right", "outer"):
+        expected = pd.merge(pd.read_csv(left_path), pd.read_csv(right_path), on="id", how=how)
+        result = collect(merge_datasets(merge, ["id"], how=how, chunk_rows=2))
+        expected = expected.sort_values(["id", "amount"]).reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_sort_merge_join_spills_when_over_budget(tmp_path):
+    left_path, right_path = write_inputs(tmp_path)
+    merge = [{"path": left_path}, {"path": right_path}]
+    for how in ("inner", "left", "right", "outer"):
+        expected = pd.merge(pd.read_csv(left_path), pd.read_csv(right_path), on="id", how=how)
+        result = collect(merge_datasets(merge, ["id"], how=how, memory_budget=1, chunk_rows=2))
+        expected = expected.sort_values(["id", "amount"]).reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_run_data_step_merge_writes_work_dataset(tmp_path, monkeypatch):
+    left_path, right_path = write_inputs(tmp_path)
+    monkeypatch.setattr(data_step, "WORK_DIR", str(tmp_path / "work"))
+    plan = {
+        "type": "data_step",
+        "name": "joined",
+        "merge": [{"path": left_path, "in": "ina"}, {"path": right_path, "in": "inb"}],
+        "by": ["id"],
+        "if": {"names": ["ina", "inb"], "op": "AND"},
+        "rename": [("amount", "total")],
+    }
+    result = data_step.run_data_step(plan, output_format="json")
+    assert result["message"] == "DATA step executed"
+    assert result["columns"] == ["id", "name", "total"]
+    assert result["shape"] == [3, 3]
+    saved = pd.read_csv(data_step.work_path("joined"))
+    assert len(saved) == 3
+
+
+def test_overlapping_columns_take_right_value(tmp_path):
+    left = pd.DataFrame({"id": [1, 2], "name": ["old1", "old2"], "x": [1, 2]})
+    right = pd.DataFrame({"id": [2, 3], "name": ["new2", "new3"]})
+    left.to_csv(tmp_path / "l.csv", index=False)
+    right.to_csv(tmp_path / "r.csv", index=False)
+    merge = [{"path": str(tmp_path / "l.csv")}, {"path": str(tmp_path / "r.csv")}]
+    for budget in (merge_datasets.__defaults__[1], 1):
+        result = pd.concat(list(merge_datasets(merge, ["id"], how="outer", memory_budget=budget)))
+        result = result.sort_values("id").reset_index(drop=True)
+        assert list(result.columns) == ["id", "name", "x"]
+        assert result["name"].tolist() == ["old1", "new2", "new3"]
+
+
+def test_empty_inner_join_keeps_header(tmp_path, monkeypatch):
+    pd.DataFrame({"id": [1], "a": [1]}).to_csv(tmp_path / "l.csv", index=False)
+    pd.DataFrame({"id": [2], "b": [2]}).to_csv(tmp_path / "r.csv", index=False)
+    monkeypatch.setattr(data_step, "WORK_DIR", str(tmp_path / "work"))
+    plan = {
+        "type": "data_step",
+        "name": "joined",
+        "merge": [{"path": str(tmp_path / "l.csv"), "in": "x"}, {"path": str(tmp_path / "r.csv"), "in": "y"}],
+        "by": ["id"],
+        "if": {"names": ["x", "y"], "op": "AND"},
+    }
+    for budget in (merge_datasets.__defaults__[1], 1):
+        monkeypatch.setattr(data_step, "merge_datasets",
+                            lambda *a, **kw: merge_datasets(*a, memory_budget=budget, **kw))
+        result = data_step.run_data_step(plan)
+        assert result["shape"] == [0, 3]
+        assert list(pd.read_csv(data_step.work_path("joined")).columns) == ["id", "a", "b"]
+
+
+def test_unmatched_rows_served_as_null(tmp_path):
+    left, right = write_inputs(tmp_path)
+    client = TestClient(importlib.import_module("backend.app").app)
+    for condition in ("", "IF a;"):
+        script = f"DATA j; MERGE {left}(in=a) {right}(in=b); BY id; {condition} RUN;"
+        response = client.post("/run-script", json={"code": script})
+        assert response.status_code == 200
+        preview = response.json()["preview"]
+        assert {"id": 1, "name": "Alice", "amount": None} in preview
@@ -0,0 +1,109 @@
+import importlib
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from backend.parser.parser import parse_script
+from backend.executor import data_step
+from backend.executor.partitions import expand_paths, partition_values, prune_parts, read_parts
+
+
+@pytest.fixture
+def parts(tmp_path):
+    for day in (1, 2, 3):
+        part = tmp_path / "events" / f"day={day}"
+        part.mkdir(parents=True)
+        pd.DataFrame({"user": ["a", "b"], "amount": [day * 10, day * 10 + 5]}).to_csv(
+            part / "part.csv", index=False)
+    return tmp_path / "events"
+
+
+def test_parse_set_glob_and_list():
+    blocks = parse_script('DATA e; SET "data/events_*.csv"; RUN; DATA f; SET a.csv b.csv; RUN;')
+    assert blocks[0]["paths"] == ["data/events_*.csv"]
+    assert blocks[1]["paths"] == ["a.csv", "b.csv"]
+
+
+def test_expand_paths(parts):
+    files = expand_paths([str(parts / "day=*" / "part.csv")])
+    assert [partition_values(f)["day"] for f in files] == [1, 2, 3]
+    with pytest.raises(FileNotFoundError):
+        expand_paths([str(parts / "nothing_*.csv")])
+
+
+def test_partition_values_from_file_name():
+    assert partition_values("data/events_day=05.csv") == {"day": 5}
+    assert partition_values("data/region=eu/part.csv") == {"region": "eu"}
+
+
+def test_partition_keys_with_underscores():
+    assert partition_values("data/store_id=7/part.csv") == {"store_id": 7}
+    assert partition_values("data/events_event_date=2024-01-05.csv") == {"event_date": "2024-01-05"}
+    assert partition_values("data/daily_report.csv") == {}
+
+
+def test_data_column_named_like_partition_key_is_not_pruned(tmp_path):
+    for store in (1, 2):
+        part = tmp_path / f"id={store}"
+        part.mkdir()
+        pd.DataFrame({"id": [3, 4], "amount": [store, store]}).to_csv(part / "part.csv", index=False)
+    plan = {
+        "type": "data_step",
+        "name": "sales",
+        "paths": [str(tmp_path / "id=*" / "part.csv")],
+        "where": {"column": "id", "op": "=", "value": "3"},
+    }
+    result = data_step.run_data_step(plan)
+    assert result["shape"] == [2, 2]
+    assert sorted(row["amount"] for row in result["preview"]) == [1, 2]
+
+
+def test_prune_parts(parts):
+    files = expand_paths([str(parts / "day=*" / "part.csv")])
+    kept = prune_parts(files, {"column": "day", "op": ">=", "value": "2"})
+    assert [partition_values(f)["day"] for f in kept] == [2, 3]
+    assert prune_parts(files, {"column": "amount", "op": ">", "value": "0"}) == files
+
+
+def test_read_parts_applies_clauses_per_part(parts):
+    files = expand_paths([str(parts / "day=*" / "part.csv")])
+    plan = {"where": {"column": "amount", "op": ">", "value": "12"}, "keep": ["day", "amount"]}
+    df = read_parts(files, pd.read_csv, transform=lambda part: data_step.apply_clauses(part, plan))
+    assert list(df.columns) == ["day", "amount"]
+    assert df["amount"].tolist() == [15, 20, 25, 30, 35]
+
+
+def test_run_data_step_glob_with_pruning(parts, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_step, "WORK_DIR", str(tmp_path / "work"))
+    read = []
+    load = data_step.load_dataset
+    monkeypatch.setattr(data_step, "load_dataset", lambda path, sheet=None: read.append(path) or load(path, sheet))
+    plan = {
+        "type": "data_step",
+        "name": "events",
+        "paths": [str(parts / "day=*" / "part.csv")],
+        "where": {"column": "day", "op": "=", "value": "3"},
+    }
+    result = data_step.run_data_step(plan, output_format="json")
+    assert result["shape"] == [2, 3]
+    assert len(read) == 1
+    assert len(pd.read_csv(data_step.work_path("events"))) == 2
+
+
+def test_where_non_numeric_value_on_numeric_column():
+    df = pd.DataFrame({"age": [25, 35]})
+    assert len(data_step.apply_clauses(df, {"where": {"column": "age", "op": "=", "value": "abc"}})) == 0
+    assert len(data_step.apply_clauses(df, {"where": {"column": "age", "op": "!=", "value": "abc"}})) == 2
+    assert len(data_step.apply_clauses(df, {"where": {"column": "age", "op": "=", "value": "35"}})) == 1
+
+
+def test_everything_pruned_keeps_header(parts, tmp_path):
+    client = TestClient(importlib.import_module("backend.app").app)
+    script = f'DATA e; SET "{parts}/day=*/part.csv"; WHERE day = 9; KEEP user, day; RUN; PROC PRINT; RUN;'
+    response = client.post("/run-script", json={"code": script})
+    assert response.status_code == 200
+    step = response.json()["results"][0]
+    assert step["columns"] == ["user", "day"]
+    assert step["shape"] == [0, 2]
+    printed = response.json()["results"][1]
+    assert printed["columns"] == ["user", "day"]
+    assert printed["preview"] == []
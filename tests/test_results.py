@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from backend.executor import shared_store
+from backend.executor.results import MAX_PAGE_ROWS, ResultCache
+from backend.executor.shared_store import SharedDatasetStore
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({"id": np.arange(1000), "score": np.arange(1000) % 7, "x": 1.0})
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = SharedDatasetStore(prefix=f"sas_results_{os.getpid()}", capacity=1024 * 1024)
+    monkeypatch.setenv(shared_store.CAPACITY_ENV, "1")
+    monkeypatch.setattr(shared_store, "_store", store)
+    yield store
+    store.clear()
+
+
+def test_local_results_bounded_by_bytes(frame):
+    cache = ResultCache(max_bytes=40_000)
+    first = cache.save(frame)["result_id"]
+    second = cache.save(frame)["result_id"]
+    assert cache.page(first) is None
+    assert cache.page(second)["total"] == 1000
+    too_big = cache.save(pd.concat([frame] * 10))
+    assert too_big["result_id"] is None
+    assert "warning" in too_big
+
+
+def test_shared_dataset_saved_as_view(store, frame):
+    store.put("scores", frame)
+    df = store.attach("scores")
+    saved = ResultCache().save(df, columns=["id", "score"], rows=10)
+    assert "warning" not in saved
+    key = f"result:{saved['result_id']}"
+    assert store._read_catalog()[key]["source"] == "scores"
+    # Another worker's cache serves it from the store
+    page = ResultCache().page(saved["result_id"], offset=8)
+    assert page["columns"] == ["id", "score"]
+    assert page["total"] == 10
+    assert page["rows"]["id"].tolist() == [8, 9]
+    store.release("scores")
+    store.evict("scores")
+    assert key not in store.keys()
+
+
+def test_result_too_large_to_share_is_reported(store, frame):
+    cache = ResultCache()
+    saved = cache.save(pd.concat([frame] * 100))
+    assert "share" in saved["warning"]
+    assert cache.page(saved["result_id"])["total"] == 100_000
+    assert ResultCache().page(saved["result_id"]) is None
+
+
+def test_page_size_is_capped(frame):
+    cache = ResultCache()
+    result_id = cache.save(pd.concat([frame] * 2))["result_id"]
+    page = cache.page(result_id, limit=10 ** 9)
+    assert page["limit"] == MAX_PAGE_ROWS
+    assert len(page["rows"]) == MAX_PAGE_ROWS
+    assert page["next_offset"] == MAX_PAGE_ROWS
@@ -0,0 +1,189 @@
+import os
+import multiprocessing
+import numpy as np
+import pandas as pd
+import pytest
+from backend.executor import shared_store
+from backend.executor.data_step import run_data_step
+from backend.executor.shared_store import SharedDatasetStore
+
+
+@pytest.fixture
+def store():
+    store = SharedDatasetStore(prefix=f"sas_test_{os.getpid()}", capacity=10 * 1024 * 1024)
+    yield store
+    store.clear()
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({
+        "name": ["Alice", "Bob", None, "Bob"],
+        "age": [25, 35, 41, 35],
+        "income": [48000.0, 52000.0, np.nan, 52000.0],
+    })
+
+
+def sum_in_child(prefix, key, queue):
+    store = SharedDatasetStore(prefix=prefix)
+    df = store.attach(key)
+    queue.put((float(df["income"].sum()), df["name"].value_counts().to_dict()))
+    store.release(key)
+
+
+def test_put_and_attach_roundtrip(store, sample_df):
+    store.put("emp", sample_df)
+    df = store.attach("emp")
+    assert list(df.columns) == ["name", "age", "income"]
+    assert df["age"].tolist() == [25, 35, 41, 35]
+    assert df["name"].isna().tolist() == [False, False, True, False]
+    assert df["name"].value_counts().to_dict() == {"Bob": 2, "Alice": 1}
+    assert np.isnan(df["income"][2])
+    store.release("emp")
+
+
+def test_attach_missing_key(store):
+    assert store.attach("missing") is None
+
+
+def test_get_or_load_loads_once(store, sample_df):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return sample_df
+
+    store.get_or_load("emp", loader)
+    store.get_or_load("emp", loader)
+    assert len(calls) == 1
+
+
+def test_other_process_attaches_without_loading(store, sample_df):
+    store.put("emp", sample_df)
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    child = ctx.Process(target=sum_in_child, args=(store.prefix, "emp", queue))
+    child.start()
+    total, counts = queue.get(timeout=60)
+    child.join()
+    assert total == 152000.0
+    assert counts == {"Bob": 2, "Alice": 1}
+
+
+def mapped(pid, name):
+    with open(f"/proc/{pid}/maps") as fh:
+        return name in fh.read()
+
+
+def attach_and_release_in_child(prefix, key, name, queue, done):
+    store = SharedDatasetStore(prefix=prefix)
+    df = store.attach(key)
+    total = float(df["x"].sum())
+    queue.put((total, mapped("self", name)))
+    del df
+    store.release(key)
+    queue.put(mapped("self", name))
+    done.wait(60)
+
+
+def test_eviction_frees_memory_across_processes(store):
+    store.put("big", pd.DataFrame({"x": np.ones(100_000)}))
+    name = store._segment_name("big", 0)
+    ctx = multiprocessing.get_context("spawn")
+    queue, done = ctx.Queue(), ctx.Event()
+    child = ctx.Process(target=attach_and_release_in_child,
+                        args=(store.prefix, "big", name, queue, done))
+    child.start()
+    try:
+        assert queue.get(timeout=60) == (100_000.0, True)
+        assert queue.get(timeout=60) is False
+        assert store.evict("big")
+        # Neither the segment nor any worker's mapping of it is left
+        assert not os.path.exists(f"/dev/shm/{name}")
+        assert not mapped(child.pid, name)
+    finally:
+        done.set()
+        child.join()
+
+
+def test_release_closes_local_mapping(store, sample_df):
+    store.put("emp", sample_df)
+    df = store.attach("emp")
+    assert "emp" in store._segments
+    store.release("emp")
+    # A live frame keeps the mapping open; it is closed once the frame is gone
+    assert "emp" not in store._segments
+    assert len(store._pending) == 1
+    assert df["age"].sum() == 136
+    del df
+    store.attach("emp")
+    store.release("emp")
+    assert store._pending == []
+
+
+def test_lru_eviction_skips_referenced(store):
+    big = pd.DataFrame({"x": np.zeros(500_000)})  # 4 MB each
+    store.put("a", big)
+    store.put("b", big)
+    store.attach("a")
+    store.put("c", big)
+    assert sorted(store.keys()) == ["a", "c"]
+    store.release("a")
+    store.put("d", big)
+    assert sorted(store.keys()) == ["c", "d"]
+
+
+def test_explicit_evict(store, sample_df):
+    store.put("emp", sample_df)
+    assert store.evict("emp")
+    assert store.attach("emp") is None
+
+
+def test_columns_keep_their_dtype(store):
+    df = pd.DataFrame({
+        "name": pd.array(["b", None, "a"], dtype="str"),
+        "mixed": ["x", 1, None],
+        "flag": [True, np.nan, False],
+        "day": [pd.Timestamp("2024-01-02").date(), None, pd.Timestamp("2024-03-04").date()],
+        "cat": pd.Categorical(["lo", "hi", "lo"], categories=["lo", "hi"], ordered=True),
+    })
+    store.put("mixed", df)
+    attached = store.attach("mixed")
+    # Text is served as a Categorical over the shared codes, without copying
+    codes = attached["name"].cat.codes.to_numpy()
+    assert not codes.flags.writeable
+    assert attached["name"].astype(object).where(attached["name"].notna(), None).tolist() == ["b", None, "a"]
+    pd.testing.assert_frame_equal(attached.drop(columns="name"), df.drop(columns="name"))
+    store.release("mixed")
+
+
+def test_data_step_same_with_store_on_and_off(store, tmp_path, monkeypatch):
+    path = tmp_path / "emp.csv"
+    path.write_text("name,age\nAlice,25\nbob,35\nCarol,41\n,50\n")
+    compute = (("assign", "up", ("call", "UPCASE", (("column", "name"),))),
+               ("assign", "low", ("compare", "<", ("column", "name"), ("const", "B"))))
+    plans = [{"type": "data_step", "name": "m", "path": str(path), "sheet": None, "compute": compute}]
+    for op in (">", "<", "=", "!="):
+        plans.append({**plans[0], "where": {"column": "name", "op": op, "value": "b"}})
+    off = [run_data_step(plan) for plan in plans]
+    monkeypatch.setenv(shared_store.CAPACITY_ENV, "10")
+    monkeypatch.setattr(shared_store, "_store", store)
+    on = [run_data_step(plan) for plan in plans]
+    assert all("error" not in result for result in off)
+    assert on == off
+
+
+def test_full_catalog_leaves_no_segments(monkeypatch):
+    monkeypatch.setattr(shared_store, "CATALOG_BYTES", 4096)
+    store = SharedDatasetStore(prefix=f"sas_full_{os.getpid()}", capacity=10 * 1024 * 1024)
+    try:
+        wide = pd.DataFrame({f"column_{i}": [i] for i in range(20)})
+        stored = [store.put(f"wide{n}", wide) for n in range(10)]
+        assert True in stored and False in stored
+        assert False in [store.put_view(f"view{n}", "wide0") for n in range(30)]
+        listed = {name for entry in store._read_catalog().values() for name in entry["segments"]}
+        on_disk = {name for name in os.listdir("/dev/shm") if name.startswith(f"{store.prefix}_")}
+        assert on_disk - {f"{store.prefix}_catalog"} == listed
+        assert store.get_or_load("wide9", lambda: wide).equals(wide)
+    finally:
+        store.clear()
@@ -0,0 +1,154 @@
+import time
+import pytest
+import importlib
+from fastapi.testclient import TestClient
+from backend.executor.step_cache import StepCache
+
+# backend/__init__.py rebinds backend.app to the FastAPI instance
+app_module = importlib.import_module("backend.app")
+client = TestClient(app_module.app)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StepCache(directory=str(tmp_path / "cache"), max_bytes=10 * 1024 * 1024)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "emp.csv"
+    path.write_text("name,age\nAlice,25\nBob,35\n")
+    return str(path)
+
+
+def test_put_and_get(cache, csv_path):
+    key = cache.key({"type": "proc_means"}, [csv_path], output_format="json")
+    assert cache.get(key) is None
+    cache.put(key, {"statistics": {1: 2}})
+    assert cache.get(key) == {"statistics": {1: 2}}
+
+
+def test_key_changes_with_input_and_options(cache, csv_path):
+    plan = {"type": "proc_means"}
+    key = cache.key(plan, [csv_path], output_format="json")
+    assert key != cache.key(plan, [csv_path], output_format="html")
+    with open(csv_path, "a") as fh:
+        fh.write("Carol,41\n")
+    assert key != cache.key(plan, [csv_path], output_format="json")
+    assert cache.key(plan, ["missing.csv"]) is None
+
+
+def test_changed_output_is_a_miss(cache, tmp_path, csv_path):
+    out = tmp_path / "work.csv"
+    out.write_text("a\n1\n")
+    key = cache.key({"type": "data_step"}, [csv_path])
+    cache.put(key, {"shape": [1, 1]}, outputs=[str(out)])
+    assert cache.get(key) == {"shape": [1, 1]}
+    out.write_text("a\n1\n2\n")
+    assert cache.get(key) is None
+
+
+def test_lru_eviction(tmp_path):
+    cache = StepCache(directory=str(tmp_path / "cache"), max_bytes=2500)
+    for name in ("a", "b"):
+        cache.put(name, "x" * 1000)
+        time.sleep(0.01)
+    cache.get("a")
+    cache.put("c", "x" * 1000)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_invalidate_and_clear(cache):
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.invalidate("a")
+    assert not cache.invalidate("a")
+    assert cache.clear() == 1
+
+
+def test_run_script_serves_unchanged_proc_from_cache(tmp_path, csv_path, monkeypatch):
+    monkeypatch.setattr(app_module, "step_cache", StepCache(directory=str(tmp_path / "cache")))
+    script = f"""
+    DATA emp;
+    SET {csv_path};
+    RUN;
+    PROC MEANS; RUN;
+    """
+    first = client.post("/run-script", json={"code": script}).json()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("dataset should not be reloaded")
+
+    monkeypatch.setattr(app_module, "load_dataset", fail)
+    monkeypatch.setattr(app_module, "run_data_step", fail)
+    second = client.post("/run-script", json={"code": script}).json()
+    assert second == first
+    assert client.delete("/cache").json()["entries"] == 2
+
+
+def merge_script(tmp_path, tag):
+    left, right = tmp_path / f"l_{tag}.csv", tmp_path / f"r_{tag}.csv"
+    left.write_text(f"id,a\n1,{tag}\n")
+    right.write_text("id,b\n1,x\n")
+    return f"""
+    DATA joined;
+    MERGE {left} {right};
+    BY id;
+    RUN;
+    PROC FREQ; RUN;
+    """
+
+
+def test_requests_write_separate_work_datasets(tmp_path):
+    first = client.post("/run-script", json={"code": merge_script(tmp_path, "first")}).json()
+    second = client.post("/run-script", json={"code": merge_script(tmp_path, "second")}).json()
+    assert first != second
+    outputs = sorted((tmp_path / "work").glob("*/joined.csv"))
+    assert len(outputs) == 2
+    assert {p.read_text().splitlines()[1] for p in outputs} == {"1,first,x", "1,second,x"}
+
+
+def test_cache_hit_reads_recorded_work_dataset(tmp_path):
+    script = merge_script(tmp_path, "first")
+    first = client.post("/run-script", json={"code": script}).json()
+    second = client.post("/run-script", json={"code": script}).json()
+    assert second == first
+    assert len(list((tmp_path / "work").glob("*/joined.csv"))) == 1
+    client.delete("/cache")
+    assert list((tmp_path / "work").glob("*/joined.csv")) == []
+
+
+def test_uncached_request_removes_its_work_dir(tmp_path):
+    client.post("/run-script", json={"code": merge_script(tmp_path, "first"), "use_cache": False})
+    assert list((tmp_path / "work").iterdir()) == []
+
+
+def test_eviction_counts_output_files(tmp_path):
+    cache = StepCache(directory=str(tmp_path / "cache"), max_bytes=8000)
+    outputs = []
+    for name in ("a", "b"):
+        out = tmp_path / f"{name}.csv"
+        out.write_text("x\n" * 3000)
+        outputs.append(out)
+        assert cache.put(name, 1, outputs=[str(out)])
+        time.sleep(0.01)
+    assert cache.get("a") is None
+    assert not outputs[0].exists()
+    assert cache.get("b") == 1
+
+
+def test_second_put_for_same_step_leaves_files_with_caller(cache, tmp_path):
+    first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+    first.write_text("a\n1\n")
+    second.write_text("a\n1\n")
+    assert cache.put("k", 1, outputs=[str(first)])
+    assert not cache.put("k", 1, outputs=[str(second)])
+    assert list(cache.lookup("k")["outputs"]) == [str(first)]
+
+
+def test_failed_step_removes_work_dir(tmp_path):
+    script = merge_script(tmp_path, "first").replace("BY id;", "BY missing;")
+    client.post("/run-script", json={"code": script})
+    assert list((tmp_path / "work").iterdir()) == []